@@ -0,0 +1,105 @@
+"""
+/autobatch range scan cost per 1k DB-channel messages against a fake Telegram client.
+
+Every get_messages call takes `--latency` seconds regardless of how many ids
+it asks for. Compares the old scan (one get_messages per id) with
+plugins.autobatch_cmd.process_batch_range on an empty `files` index, and
+again once the range has been indexed.
+
+    python -m benchmarks.autobatch_scan --messages 1000
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from types import SimpleNamespace
+
+from pyrogram.enums import MessageMediaType
+
+from helper.database import MongoDB
+from helper.quality_detector import extract_quality, get_base_name
+from plugins.autobatch_cmd import process_batch_range
+from benchmarks.fakes import bind_fake
+
+CHANNEL = -100123
+QUALITIES = ("480p", "720p", "1080p")
+
+
+class FakeMessage:
+    async def reply(self, *a, **kw):
+        pass
+
+    async def edit_text(self, *a, **kw):
+        pass
+
+
+class FakeTelegram:
+    def __init__(self, messages: int, latency: float):
+        self.name = "bench"
+        self.username = "bench_bot"
+        self.db_channel_id = CHANNEL
+        self.auto_del = 0
+        self.latency = latency
+        self.rpcs = 0
+        MongoDB._instances.clear()
+        self.mongodb = MongoDB("mongodb://localhost:27017", "bench_autobatch")
+        bind_fake(self.mongodb)
+        self.store = {}
+        for mid in range(1, messages + 1):
+            episode, quality = divmod(mid - 1, len(QUALITIES))
+            name = f"Show.S01E{episode + 1:03}.{QUALITIES[quality]}.WEB-DL.mkv"
+            self.store[mid] = SimpleNamespace(
+                id=mid, empty=False, chat=SimpleNamespace(id=CHANNEL), caption=None,
+                media=MessageMediaType.DOCUMENT,
+                document=SimpleNamespace(file_id=f"F{mid}", file_unique_id=f"U{mid}", file_name=name,
+                                         file_size=1, mime_type="video/x-matroska")
+            )
+
+    def LOGGER(self, *_):
+        return logging.getLogger("bench")
+
+    async def get_messages(self, chat_id, message_ids):
+        self.rpcs += 1
+        await asyncio.sleep(self.latency)
+        if isinstance(message_ids, int):
+            return self.store.get(message_ids)
+        return [self.store.get(mid, SimpleNamespace(id=mid, empty=True)) for mid in message_ids]
+
+
+async def old_scan(tg, first_id, last_id):
+    """The pre-paging loop: one awaited get_messages per id."""
+    groups = {}
+    for msg_id in range(first_id, last_id + 1):
+        msg = await tg.get_messages(CHANNEL, msg_id)
+        if not msg or not msg.document:
+            continue
+        filename = msg.document.file_name
+        if extract_quality(filename):
+            groups.setdefault(get_base_name(filename), []).append(msg_id)
+    return groups
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per get_messages call")
+    args = parser.parse_args()
+
+    tg = FakeTelegram(args.messages, args.latency)
+    runs = (
+        ("old per-id scan", lambda: old_scan(tg, 1, args.messages)),
+        ("paged, cold index", lambda: process_batch_range(tg, FakeMessage(), 1, args.messages)),
+        ("paged, indexed", lambda: process_batch_range(tg, FakeMessage(), 1, args.messages)),
+    )
+    for label, run in runs:
+        tg.rpcs = 0
+        started = time.monotonic()
+        await run()
+        elapsed = time.monotonic() - started
+        per_k = 1000 / args.messages
+        print(f"{label:<18} rpcs/1k={tg.rpcs * per_k:7.1f}  wall/1k={elapsed * per_k:7.2f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+"""
+Broadcast throughput against a fake Telegram client with a simulated flood limit.
+
+The fake answers each copy after `--latency` seconds and raises FloodWait when
+more than `--limit` messages were sent in the last second. Compares the old
+sequential loop from plugins/broadcast.py with helper.broadcast.BroadcastEngine.
+
+    python -m benchmarks.broadcast_throughput --users 500
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from collections import deque
+from types import SimpleNamespace
+
+from pyrogram.errors import FloodWait
+
+from helper.database import MongoDB
+from helper.broadcast import BroadcastEngine
+from benchmarks.fakes import bind_fake
+
+
+class FakeTelegram:
+    def __init__(self, mongodb, latency: float, limit: int, penalty: int):
+        self.name = "bench"
+        self.mongodb = mongodb
+        self.latency = latency
+        self.limit = limit
+        self.penalty = penalty
+        self.sent = 0
+        self.flood_waits = 0
+        self._window = deque()
+        self._next_id = 1
+
+    def LOGGER(self, *_):
+        return logging.getLogger("bench")
+
+    async def copy_message(self, chat_id, from_chat_id, message_id):
+        await asyncio.sleep(self.latency)
+        now = time.monotonic()
+        while self._window and now - self._window[0] > 1:
+            self._window.popleft()
+        if len(self._window) >= self.limit:
+            self.flood_waits += 1
+            raise FloodWait(value=self.penalty)
+        self._window.append(now)
+        self.sent += 1
+        self._next_id += 1
+        return SimpleNamespace(id=self._next_id)
+
+    async def pin_chat_message(self, **kw):
+        await asyncio.sleep(self.latency)
+
+    async def edit_message_text(self, *a, **kw):
+        pass
+
+
+async def _setup(args, db_name):
+    MongoDB._instances.clear()
+    db = MongoDB("mongodb://localhost:27017", db_name)
+    bind_fake(db)
+    for uid in range(1000, 1000 + args.users):
+        await db.user_data.insert_one({'_id': uid, 'ban': False})
+    return db, FakeTelegram(db, args.latency, args.limit, args.penalty)
+
+
+async def sequential(args):
+    """The pre-engine loop: one awaited copy per user, sleep inline on FloodWait."""
+    db, tg = await _setup(args, "bench_seq")
+    started = time.monotonic()
+    async for chat_id in db.iter_user_ids():
+        try:
+            await tg.copy_message(chat_id, 1, 1)
+        except FloodWait as e:
+            await asyncio.sleep(e.value)
+            await tg.copy_message(chat_id, 1, 1)
+    return tg, time.monotonic() - started
+
+
+async def engine(args):
+    db, tg = await _setup(args, "bench_engine")
+    run = {'_id': 1, 'from_chat_id': 1, 'message_id': 1, 'action': 'send', 'ttl': 0,
+           'status_chat_id': 1, 'status_message_id': 1}
+    started = time.monotonic()
+    await BroadcastEngine(tg, run, workers=args.workers, rate=args.rate).execute()
+    return tg, time.monotonic() - started
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds per Telegram call")
+    parser.add_argument("--limit", type=int, default=30, help="simulated flood limit, msgs/sec")
+    parser.add_argument("--penalty", type=int, default=3, help="FloodWait seconds when the limit is hit")
+    parser.add_argument("--workers", type=int, default=20)
+    parser.add_argument("--rate", type=float, default=25)
+    args = parser.parse_args()
+
+    for label, fn in (("sequential", sequential), ("engine", engine)):
+        tg, elapsed = await fn(args)
+        print(f"{label:<11} sent={tg.sent:<6} flood_waits={tg.flood_waits:<4} "
+              f"elapsed={elapsed:6.2f}s  rate={tg.sent / elapsed:6.1f} msg/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,104 @@
+"""
+Credit expiry passes over a large set of credit holders.
+
+Seeds `--users` credit documents: `--expired` of them already past expiry,
+`--expiring` of them expiring within 24h, the rest later. Runs two
+consecutive passes of the old hourly loop (update_many + get_expiring_soon +
+one awaited send per user) and of CreditExpiry.run_once, against a fake
+Telegram client where every send takes `--latency` seconds. CreditExpiry
+sends at its configured EXPIRY_WARN_RATE. Reports warnings sent per pass,
+round-trips and wall time.
+
+    python -m benchmarks.credit_expiry --users 100000
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+
+from helper.credit_expiry import CreditExpiry
+from helper.enhanced_credit_db import EnhancedCreditDB
+from benchmarks.fakes import bind_fake
+
+
+class FakeTelegram:
+    def __init__(self, latency: float):
+        self.name = "bench"
+        self.db_uri = "mongodb://localhost:27017"
+        self.db_name = "bench_credit_expiry"
+        self.latency = latency
+        self.sent = 0
+
+    def LOGGER(self, *_):
+        return logging.getLogger("bench")
+
+    async def send_message(self, chat_id, text):
+        self.sent += 1
+        await asyncio.sleep(self.latency)
+
+
+async def seed(db, users: int, expired: float, expiring: float):
+    rng = random.Random(1)
+    now = datetime.now()
+    for user_id in range(1, users + 1):
+        roll = rng.random()
+        if roll < expired:
+            expiry = now - timedelta(hours=rng.uniform(1, 48))
+        elif roll < expired + expiring:
+            expiry = now + timedelta(hours=rng.uniform(1, 23))
+        else:
+            expiry = now + timedelta(days=rng.uniform(2, 30))
+        await db.credit_data.insert_one({"_id": user_id, "balance": rng.randint(1, 20), "expiry": expiry})
+
+
+async def old_pass(db, tg):
+    """The pre-CreditExpiry loop body (without the hourly sleep)."""
+    now = datetime.now()
+    await db.credit_data.update_many(
+        {"expiry": {"$lte": now}, "balance": {"$gt": 0}},
+        {"$set": {"balance": 0, "expiry": None}}
+    )
+    cursor = db.credit_data.find({
+        "expiry": {"$lte": now + timedelta(hours=24), "$gte": now},
+        "balance": {"$gt": 0}
+    })
+    for user in [doc async for doc in cursor]:
+        try:
+            await tg.send_message(user["_id"], "warning")
+        except Exception:
+            pass
+
+
+async def run(label, users, args, make_pass):
+    EnhancedCreditDB._instances.clear()
+    tg = FakeTelegram(args.latency)
+    db = EnhancedCreditDB(tg.db_uri, tg.db_name)
+    fake = bind_fake(db)
+    await seed(db, users, args.expired, args.expiring)
+    one_pass = make_pass(tg, db)
+    for n in (1, 2):
+        fake.calls.clear()
+        tg.sent = 0
+        started = time.monotonic()
+        await one_pass()
+        elapsed = time.monotonic() - started
+        print(f"{label:<12} pass {n}: warnings={tg.sent:<6} round-trips={sum(fake.calls.values()):<5} wall={elapsed:6.2f}s")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--expired", type=float, default=0.05)
+    parser.add_argument("--expiring", type=float, default=0.01)
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds per send_message")
+    args = parser.parse_args()
+
+    await run("old loop", args.users, args, lambda tg, db: lambda: old_pass(db, tg))
+    await run("CreditExpiry", args.users, args, lambda tg, db: CreditExpiry(tg).run_once)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+"""
+Parallel credit spends against one balance.
+
+Fires `--spends` concurrent file opens at a user holding `--balance`
+credits. Every fake MongoDB call yields to the event loop first, the way
+a real round-trip does, so concurrent opens interleave. Compares the old
+read-then-decrement path (get_credits, then an unconditional $inc -1)
+with EnhancedCreditDB.try_spend, and reports how many spends succeeded,
+the final balance and the round-trips per open. Exits non-zero if
+try_spend overspends.
+
+    python -m benchmarks.credit_spend --spends 100 --balance 10
+"""
+
+import argparse
+import asyncio
+import sys
+
+from helper.enhanced_credit_db import EnhancedCreditDB
+from benchmarks.fakes import bind_fake
+
+USER_ID = 42
+
+
+class RoundTrip:
+    """Wraps a fake collection so every call yields to the event loop before running."""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if not asyncio.iscoroutinefunction(attr):
+            return attr
+
+        async def call(*args, **kwargs):
+            await asyncio.sleep(0)
+            return await attr(*args, **kwargs)
+
+        return call
+
+
+async def old_spend(db):
+    credits = await db.get_credits(USER_ID)
+    if credits["balance"] <= 0:
+        return None
+    await db.credit_data.update_one({"_id": USER_ID}, {"$inc": {"balance": -1, "total_spent": 1}})
+    await db.add_transaction(USER_ID, "spent", 1, "file_access")
+    return credits["balance"] - 1
+
+
+async def new_spend(db):
+    return await db.try_spend(USER_ID, 1)
+
+
+async def run(label, spend, spends, balance):
+    EnhancedCreditDB._instances.clear()
+    db = EnhancedCreditDB("mongodb://localhost:27017", f"bench_spend_{spend.__name__}")
+    fake = bind_fake(db)
+    db.credit_data = RoundTrip(db.credit_data)
+    db.ledger = RoundTrip(db.ledger)
+    await db.credit_data.insert_one({"_id": USER_ID, "balance": balance, "expiry": None, "total_spent": 0})
+    fake.calls.clear()
+
+    results = await asyncio.gather(*(spend(db) for _ in range(spends)))
+    succeeded = sum(1 for r in results if r is not None)
+    final = (await db.get_credits(USER_ID))["balance"]
+    print(f"{label:<16} spent={succeeded:<4} final balance={final:<5} round-trips/open={sum(fake.calls.values()) / spends:.2f}")
+    return succeeded, final
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--spends", type=int, default=100)
+    parser.add_argument("--balance", type=int, default=10)
+    args = parser.parse_args()
+
+    await run("read + $inc", old_spend, args.spends, args.balance)
+    succeeded, final = await run("try_spend", new_spend, args.spends, args.balance)
+    if succeeded != min(args.spends, args.balance) or final != max(args.balance - args.spends, 0):
+        print("try_spend overspent or underspent")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
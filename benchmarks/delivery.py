@@ -0,0 +1,165 @@
+"""
+File delivery latency for 1, 10 and 100-file packs against a fake Telegram client.
+
+Every RPC takes `--latency` seconds. Compares the old path (get_messages, then
+one awaited msg.copy per file) with get_file_descriptors + DeliveryPipeline,
+cold (not yet in the `files` index), indexed, and with the message cache warm,
+with and without a CAPTION template (the template forces one caption edit per
+forwarded file). Only Telegram RPCs are counted; the fake Mongo is free.
+Finally checks that editing a DB-channel post refreshes its stored caption,
+deleting one makes it undeliverable, and a bulk forward that drops a post
+still delivers every file exactly once (exits non-zero otherwise).
+
+    python -m benchmarks.delivery --latency 0.08
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from types import SimpleNamespace
+
+from pyrogram.enums import MessageMediaType
+
+from helper.cache import TTLCache
+from helper.database import MongoDB
+from helper.delivery import DeliveryPipeline, get_file_descriptors
+from helper.helper_func import get_messages
+from plugins.channel_post import deleted_posts, edited_post
+from benchmarks.fakes import bind_fake
+
+
+class FakeTelegram:
+    def __init__(self, latency: float, caption_template: str):
+        self.name = "bench"
+        self.db = -100123
+        self.protect = False
+        self.message_cache = TTLCache()
+        MongoDB._instances.clear()
+        self.mongodb = MongoDB("mongodb://localhost:27017", "bench_delivery")
+        bind_fake(self.mongodb)
+        self.messages = {'CAPTION': caption_template}
+        self.latency = latency
+        self.rpcs = 0
+        self.delivered = 0
+        self._next_id = 1
+
+    def LOGGER(self, *_):
+        return logging.getLogger("bench")
+
+    def _out(self, caption_html, source=None):
+        self._next_id += 1
+        self.delivered += 1
+        return SimpleNamespace(
+            id=self._next_id, caption=SimpleNamespace(html=caption_html) if caption_html else None,
+            media=getattr(source, 'media', None), document=getattr(source, 'document', None)
+        )
+
+    async def _rpc(self):
+        self.rpcs += 1
+        await asyncio.sleep(self.latency)
+
+    async def forward_messages(self, chat_id, from_chat_id, message_ids, **kw):
+        await self._rpc()
+        # Deleted posts are silently left out, like Telegram does
+        return [self._out(self.store[mid].caption.html, self.store[mid]) for mid in message_ids if not self.store[mid].empty]
+
+    async def get_messages(self, chat_id, message_ids):
+        await self._rpc()
+        return [self.store[mid] for mid in message_ids]
+
+    async def send_cached_media(self, caption=None, **kw):
+        await self._rpc()
+        return self._out(caption)
+
+    async def edit_message_caption(self, **kw):
+        await self._rpc()
+
+    def make_messages(self, count: int):
+        self.store = {}
+        msgs = []
+        for mid in range(1, count + 1):
+            msg = SimpleNamespace(
+                id=mid, empty=False, media=MessageMediaType.DOCUMENT, chat=SimpleNamespace(id=self.db),
+                caption=SimpleNamespace(html=f"Episode {mid}"),
+                document=SimpleNamespace(file_id=f"F{mid}", file_unique_id=f"U{mid}", file_name=f"Show.S01E{mid:02}.mkv")
+            )
+
+            async def copy(chat_id, caption=None, protect_content=None):
+                await self._rpc()
+                return self._out(caption, msg)
+
+            msg.copy = copy
+            self.store[mid] = msg
+            msgs.append(msg)
+        return msgs
+
+
+async def old_path(tg, ids):
+    template = tg.messages.get('CAPTION', '')
+    for msg in await get_messages(tg, ids):
+        caption = (
+            template.format(previouscaption=f"<blockquote>{msg.caption.html}</blockquote>")
+            if template else msg.caption.html
+        )
+        await msg.copy(chat_id=1, caption=caption, protect_content=tg.protect)
+
+
+async def pipeline(tg, ids):
+    await DeliveryPipeline(tg, 1).send(await get_file_descriptors(tg, ids))
+
+
+async def check_edits_and_deletes() -> bool:
+    tg = FakeTelegram(0, "")
+    ids = [msg.id for msg in tg.make_messages(3)]
+    await get_file_descriptors(tg, ids)  # Indexed and cached
+
+    tg.store[1].caption = SimpleNamespace(html="Episode 1 (fixed)")
+    await edited_post(tg, tg.store[1])
+    tg.store[2] = SimpleNamespace(id=2, empty=True)
+    await deleted_posts(tg, [SimpleNamespace(id=2, chat=SimpleNamespace(id=tg.db))])
+
+    files = await get_file_descriptors(tg, ids)
+    edited = files[0].caption_html == "Episode 1 (fixed)"
+    deleted = [f.msg_id for f in files] == [1, 3]
+    print(f"edited caption picked up: {edited}  deleted post undeliverable: {deleted}")
+    return edited and deleted
+
+
+async def check_partial_forward() -> bool:
+    tg = FakeTelegram(0, "")
+    ids = [msg.id for msg in tg.make_messages(5)]
+    files = await get_file_descriptors(tg, ids)
+    tg.store[3] = SimpleNamespace(id=3, empty=True)  # Deleted after it was indexed
+    sent = await DeliveryPipeline(tg, 1).send(files)
+    ok = len(sent) == tg.delivered == 5
+    print(f"partial bulk forward: returned={len(sent)} delivered={tg.delivered} (expected 5 each)")
+    return ok
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.08, help="seconds per Telegram call")
+    args = parser.parse_args()
+
+    for template in ("", "{previouscaption}\nJoin @Awakeners_Bots"):
+        print(f"CAPTION template: {'set' if template else 'unset'}")
+        for count in (1, 10, 100):
+            tg = FakeTelegram(args.latency, template)
+            ids = [msg.id for msg in tg.make_messages(count)]
+            for label, fn in (("old path", old_path), ("cold", pipeline), ("indexed", pipeline), ("warm", pipeline)):
+                if label == "indexed":
+                    tg.message_cache.clear()
+                tg.rpcs = 0
+                started = time.monotonic()
+                await fn(tg, ids)
+                elapsed = time.monotonic() - started
+                print(f"  {count:>3} files  {label:<9} rpcs={tg.rpcs:<4} elapsed={elapsed:6.2f}s")
+
+    if not (await check_edits_and_deletes() and await check_partial_forward()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,255 @@
+# In-memory stand-ins used by the benchmarks to count database round-trips
+# without a live MongoDB server.
+
+import itertools
+from collections import Counter
+
+
+def _get(doc, path):
+    for part in path.split('.'):
+        if not isinstance(doc, dict) or part not in doc:
+            return None, False
+        doc = doc[part]
+    return doc, True
+
+
+def _match_value(value, present, cond):
+    if isinstance(cond, dict) and cond and all(k.startswith('$') for k in cond):
+        for op, arg in cond.items():
+            if op == '$exists':
+                if present != bool(arg):
+                    return False
+            elif op == '$in':
+                if value not in arg:
+                    return False
+            elif op == '$nin':
+                if value in arg:
+                    return False
+            elif op == '$ne':
+                if value == arg:
+                    return False
+            elif op in ('$gt', '$gte', '$lt', '$lte'):
+                if not present or value is None:
+                    return False
+                if op == '$gt' and not value > arg:
+                    return False
+                if op == '$gte' and not value >= arg:
+                    return False
+                if op == '$lt' and not value < arg:
+                    return False
+                if op == '$lte' and not value <= arg:
+                    return False
+            else:
+                raise NotImplementedError(op)
+        return True
+    if isinstance(value, list) and not isinstance(cond, list):
+        return cond in value
+    return value == cond
+
+
+def matches(doc, flt):
+    for key, cond in (flt or {}).items():
+        if key == '$or':
+            if not any(matches(doc, sub) for sub in cond):
+                return False
+            continue
+        if key == '$and':
+            if not all(matches(doc, sub) for sub in cond):
+                return False
+            continue
+        value, present = _get(doc, key)
+        if not _match_value(value, present, cond):
+            return False
+    return True
+
+
+def apply_update(doc, update, inserting=False):
+    for op, fields in update.items():
+        for key, val in fields.items():
+            if op == '$set' or (op == '$setOnInsert' and inserting):
+                doc[key] = val
+            elif op == '$inc':
+                doc[key] = doc.get(key, 0) + val
+            elif op == '$addToSet':
+                doc.setdefault(key, [])
+                if val not in doc[key]:
+                    doc[key].append(val)
+            elif op == '$push':
+                doc.setdefault(key, []).append(val)
+            elif op == '$pull':
+                doc[key] = [v for v in doc.get(key, []) if v != val]
+            elif op == '$unset':
+                doc.pop(key, None)
+            elif op == '$setOnInsert':
+                pass
+            else:
+                raise NotImplementedError(op)
+
+
+class _Result:
+    def __init__(self, **kw):
+        self.__dict__.update(kw)
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self._docs = docs
+
+    def sort(self, key, direction=1):
+        keys = key if isinstance(key, list) else [(key, direction)]
+        for field, order in reversed(keys):  # Stable sorts, least significant key first
+            self._docs.sort(key=lambda d: d.get(field), reverse=order == -1)
+        return self
+
+    def limit(self, n):
+        if n:
+            self._docs = self._docs[:n]
+        return self
+
+    def batch_size(self, n):
+        return self
+
+    async def to_list(self, length=None):
+        return self._docs[:length] if length else list(self._docs)
+
+    def __aiter__(self):
+        self._it = iter(self._docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._it)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    """Dict-backed collection that counts every call that would be a round-trip."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, name, calls: Counter):
+        self.name = name
+        self.docs = {}
+        self.calls = calls
+
+    def _hit(self, op):
+        self.calls[f"{self.name}.{op}"] += 1
+
+    def _find(self, flt):
+        return [d for d in self.docs.values() if matches(d, flt)]
+
+    async def find_one(self, flt=None, projection=None, sort=None, **kw):
+        self._hit('find_one')
+        found = self._find(flt)
+        if sort:
+            found = FakeCursor(found).sort(sort)._docs
+        return dict(found[0]) if found else None
+
+    def find(self, flt=None, projection=None, **kw):
+        self._hit('find')
+        return FakeCursor([dict(d) for d in self._find(flt)])
+
+    async def insert_one(self, doc):
+        self._hit('insert_one')
+        doc.setdefault('_id', next(self._ids))
+        if doc['_id'] in self.docs:
+            raise KeyError('duplicate key')
+        self.docs[doc['_id']] = dict(doc)
+        return _Result(inserted_id=doc['_id'])
+
+    async def insert_many(self, docs, ordered=True):
+        self._hit('insert_many')
+        for doc in docs:
+            doc.setdefault('_id', next(self._ids))
+            self.docs[doc['_id']] = dict(doc)
+        return _Result(inserted_ids=[d['_id'] for d in docs])
+
+    def _upsert(self, flt, update, upsert):
+        found = self._find(flt)
+        if found:
+            apply_update(found[0], update)
+            return found[0], 1
+        if not upsert:
+            return None, 0
+        doc = {k: v for k, v in flt.items() if not isinstance(v, dict) and not k.startswith('$')}
+        doc.setdefault('_id', next(self._ids))
+        apply_update(doc, update, inserting=True)
+        self.docs[doc['_id']] = doc
+        return doc, 0
+
+    async def update_one(self, flt, update, upsert=False):
+        self._hit('update_one')
+        _, modified = self._upsert(flt, update, upsert)
+        return _Result(modified_count=modified)
+
+    async def update_many(self, flt, update, upsert=False):
+        self._hit('update_many')
+        found = self._find(flt)
+        for doc in found:
+            apply_update(doc, update)
+        return _Result(modified_count=len(found))
+
+    async def bulk_write(self, requests, ordered=True):
+        # Only UpdateOne is used by the code under benchmark
+        self._hit('bulk_write')
+        for op in requests:
+            self._upsert(op._filter, op._doc, op._upsert)
+        return _Result(modified_count=len(requests))
+
+    async def find_one_and_update(self, flt, update, projection=None, upsert=False, return_document=False, **kw):
+        self._hit('find_one_and_update')
+        found = self._find(flt)
+        before = dict(found[0]) if found else None
+        doc, _ = self._upsert(flt, update, upsert)
+        return dict(doc) if (return_document and doc) else before
+
+    async def delete_one(self, flt):
+        self._hit('delete_one')
+        for doc in self._find(flt)[:1]:
+            del self.docs[doc['_id']]
+
+    async def delete_many(self, flt):
+        self._hit('delete_many')
+        found = self._find(flt)
+        for doc in found:
+            del self.docs[doc['_id']]
+        return _Result(deleted_count=len(found))
+
+    async def count_documents(self, flt, **kw):
+        self._hit('count_documents')
+        return len(self._find(flt))
+
+    async def estimated_document_count(self):
+        self._hit('estimated_document_count')
+        return len(self.docs)
+
+    async def create_index(self, *args, **kw):
+        self._hit('create_index')
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.calls = Counter()
+        self._collections = {}
+
+    def __getitem__(self, name):
+        if name not in self._collections:
+            self._collections[name] = FakeCollection(name, self.calls)
+        return self._collections[name]
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self[name]
+
+
+def bind_fake(instance):
+    """Point every motor collection on a MongoDB-style instance at a FakeDatabase."""
+    from motor.motor_asyncio import AsyncIOMotorCollection
+    fake = FakeDatabase()
+    for attr, value in list(vars(instance).items()):
+        if isinstance(value, AsyncIOMotorCollection):
+            setattr(instance, attr, fake[value.name])
+    instance.db = fake
+    return fake
@@ -0,0 +1,154 @@
+"""
+Filename parsing cost over a corpus of realistic release names.
+
+Each name is looked up the way the batch code does it: quality, base name,
+series name and episode info, one call each. Compares the old chain of
+uncompiled re.search / re.sub calls (kept here verbatim as the reference)
+with the helper.quality_detector wrappers over parse_filename, with the memo
+cleared per name and left on. Also checks that every name gets the same
+quality, base name, series name and season/episode from both; exits non-zero
+on any mismatch.
+
+    python -m benchmarks.filename_parser --names 100000
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+
+from helper import quality_detector as qd
+from helper.quality_detector import QUALITY_PATTERNS, parse_filename
+
+TITLES = [
+    "The Ancient Magus Bride", "Breaking Bad", "One Piece", "Jujutsu Kaisen", "The Office",
+    "Attack on Titan", "Stranger Things", "Demon Slayer", "Money Heist", "Dark", "Spy x Family",
+    "House of the Dragon", "Vinland Saga", "Chainsaw Man", "Peaky Blinders", "Mirzapur",
+]
+QUALITIES = ["480p", "720p", "1080p", "2160p", "4K", "HDRip", "HD-Rip", "360p", ""]
+SOURCES = ["WEB-DL", "WEBRip", "BluRay", "BRRip", "HDTV", ""]
+CODECS = ["x264", "x265", "HEVC", "H.264", "10bit", ""]
+EXTRAS = ["Dual Audio", "Multi", "Hindi", "ESub", "[Org Audio]", "(Uncut)", "AAC2.0", ""]
+TAGS = ["[@Awakeners_Bots]", "-PSA", "-RARBG", "[SubsPlease]", "@Channel", ""]
+EXTS = ["mkv", "mp4", "avi"]
+SEPARATORS = [".", " ", "_"]
+
+
+def release_name(rng: random.Random) -> str:
+    title = rng.choice(TITLES)
+    style = rng.random()
+    if style < 0.5:
+        episode = f"S{rng.randint(1, 12):02}E{rng.randint(1, 60):02}"
+    elif style < 0.65:
+        episode = f"E{rng.randint(1, 1100):02}"
+    elif style < 0.75:
+        episode = f"Episode {rng.randint(1, 60)}"
+    elif style < 0.85:
+        episode = f"S{rng.randint(1, 12):02}"
+    else:
+        episode = f"({rng.randint(1995, 2025)})"
+    parts = [title, episode] if rng.random() < 0.8 else [episode, title]
+    parts += [rng.choice(QUALITIES), rng.choice(SOURCES), rng.choice(CODECS), rng.choice(EXTRAS)]
+    tag = rng.choice(TAGS)
+    sep = rng.choice(SEPARATORS)
+    name = sep.join(p.replace(" ", sep) for p in parts if p)
+    if tag.startswith("["):
+        name = f"{tag} {name}" if rng.random() < 0.5 else f"{name} {tag}"
+    else:
+        name += tag
+    return f"{name}.{rng.choice(EXTS)}"
+
+
+# The pre-compiled-parser implementation, unchanged
+
+def old_extract_quality(filename):
+    for quality, (pattern, _) in QUALITY_PATTERNS.items():
+        if re.search(pattern, filename, re.IGNORECASE):
+            return quality
+    return None
+
+
+def old_get_base_name(filename):
+    name = filename.rsplit('.', 1)[0] if '.' in filename else filename
+    name = re.sub(r'[.\-_/;:,\\]+', ' ', name)
+    for quality, (pattern, _) in QUALITY_PATTERNS.items():
+        name = re.sub(pattern, '', name, flags=re.IGNORECASE)
+    patterns_to_remove = [
+        r'S\d+E\d+', r'\bS\d+\b', r'Season\s*\d+', r'Episode\s*\d+', r'\d{4}',
+        r'BluRay|BRRip|WEBRip|WEB-DL', r'x264|x265|HEVC', r'\bDual\b', r'\bAudio\b',
+        r'\bMulti\b', r'\bmkv\b', r'\bmp4\b', r'\bavi\b', r'\[.*?\]', r'\(.*?\)',
+    ]
+    for pattern in patterns_to_remove:
+        name = re.sub(pattern, '', name, flags=re.IGNORECASE)
+    name = re.sub(r'[.\-_]+', ' ', name)
+    return re.sub(r'\s+', ' ', name).strip()
+
+
+def old_get_series_name(filename):
+    name = old_get_base_name(filename)
+    for pattern in [r'\bE\d+\b', r'\bEp\d+\b', r'\bEpisode\s*\d+\b', r'^\d+\s+', r'\s+\d+$']:
+        name = re.sub(pattern, '', name, flags=re.IGNORECASE)
+    return re.sub(r'\s+', ' ', name).strip()
+
+
+def old_parse_episode_info(filename):
+    match = re.search(r'S(\d+)[._-]*E(\d+)', filename, re.IGNORECASE)
+    return (int(match.group(1)), int(match.group(2))) if match else (None, None)
+
+
+def old_parse(filename):
+    return (
+        old_extract_quality(filename), old_get_base_name(filename),
+        old_get_series_name(filename), *old_parse_episode_info(filename)
+    )
+
+
+def new_parse(filename):
+    episode = qd.parse_episode_info(filename)
+    return (
+        qd.extract_quality(filename), qd.get_base_name(filename),
+        qd.get_series_name(filename), episode['season'], episode['episode']
+    )
+
+
+def new_parse_cold(filename):
+    parse_filename.cache_clear()
+    return new_parse(filename)
+
+
+def timed(label, fn, names):
+    started = time.perf_counter()
+    for name in names:
+        fn(name)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<22} {elapsed:7.3f}s  {elapsed / len(names) * 1e6:6.2f} µs/name")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--names", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    names = [release_name(rng) for _ in range(args.names)]
+    print(f"{len(names)} names, {len(set(names))} distinct")
+
+    mismatches = [name for name in set(names) if old_parse(name) != new_parse(name)]
+    parse_filename.cache_clear()
+
+    timed("old regex chain", old_parse, names)
+    timed("compiled, no memo", new_parse_cold, names)
+    parse_filename.cache_clear()
+    timed("compiled + memo", new_parse, names)
+    print(parse_filename.cache_info())
+
+    for name in mismatches[:20]:
+        print(f"MISMATCH {name!r}\n  old={old_parse(name)}\n  new={new_parse(name)}")
+    print(f"{len(mismatches)} mismatches")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
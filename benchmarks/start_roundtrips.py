@@ -0,0 +1,75 @@
+"""
+Count MongoDB round-trips made by the /start deep-link path.
+
+Replays the MongoDB calls `plugins/start.py` makes for a user opening a
+verified shortener link, once with a cold bot_config cache and once after
+`load_bot_config()`.
+
+    python -m benchmarks.start_roundtrips
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+from helper.database import MongoDB
+from benchmarks.fakes import bind_fake
+
+USER_ID = 42
+TOKEN = "a" * 32
+BASE64 = "AbCdEfGhIjKlMn"
+
+
+async def simulate_start(db: MongoDB):
+    """Same MongoDB calls, in the same order, as start_command for a verified link."""
+    await db.get_user_session(USER_ID)
+
+    if await db.get_bot_config('token_verification_enabled', True):
+        await db.verify_access_token(USER_ID, TOKEN, BASE64)
+        if await db.is_credit_system_enabled():
+            await db.get_bot_config('verification_reward', 3)
+
+    await db.is_credit_system_enabled()
+    await db.get_bot_config('token_verification_enabled', True)
+
+
+async def run(cached: bool) -> dict:
+    MongoDB._instances.clear()
+    db = MongoDB("mongodb://localhost:27017", f"bench_{cached}")
+    fake = bind_fake(db)
+    for key, value in {
+        'token_verification_enabled': True,
+        'credit_system_enabled': True,
+        'verification_reward': 3,
+        'token_expiry_minutes': 10,
+        'bypass_check_enabled': True,
+        'bypass_timer': 60,
+    }.items():
+        await db.bot_config.update_one({'_id': key}, {'$set': {'value': value}}, upsert=True)
+    await db.access_tokens.insert_one({
+        'user_id': USER_ID, 'base64': BASE64, 'token': TOKEN,
+        'created': datetime.now() - timedelta(minutes=2), 'used': False,
+        'use_count': 0, 'click_count': 0,
+        'expires': datetime.now() + timedelta(minutes=8)
+    })
+    if cached:
+        await db.load_bot_config()
+    fake.calls.clear()
+    await simulate_start(db)
+    return dict(fake.calls)
+
+
+def _report(label: str, calls: dict):
+    total = sum(calls.values())
+    config = sum(v for k, v in calls.items() if k.startswith('bot_config.'))
+    print(f"{label:<8} total={total:<3} bot_config={config}")
+    for key in sorted(calls):
+        print(f"    {key:<32} {calls[key]}")
+
+
+async def main():
+    _report("before", await run(cached=False))
+    _report("after", await run(cached=True))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
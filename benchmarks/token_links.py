@@ -0,0 +1,60 @@
+"""
+MongoDB round-trips for /start <token> traffic on a few viral links.
+
+Replays `--clicks` link opens drawn from a Zipf-like distribution over
+`--tokens` file tokens, with `--invalid` of them being garbage tokens,
+through MongoDB.resolve_file_token, then flushes the click buffer. Reports
+round-trips per 1k opens, the token cache hit ratio and its memory footprint,
+and checks that the stored click counts add up.
+
+    python -m benchmarks.token_links --clicks 100000
+"""
+
+import argparse
+import asyncio
+import random
+
+from helper.database import MongoDB
+from benchmarks.fakes import bind_fake
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clicks", type=int, default=100_000)
+    parser.add_argument("--tokens", type=int, default=2_000)
+    parser.add_argument("--invalid", type=float, default=0.05, help="share of opens with a bad token")
+    args = parser.parse_args()
+
+    MongoDB._instances.clear()
+    db = MongoDB("mongodb://localhost:27017", "bench_token_links")
+    fake = bind_fake(db)
+    tokens = [await db.create_file_token(-100123, i) for i in range(1, args.tokens + 1)]
+    weights = [1 / rank for rank in range(1, len(tokens) + 1)]
+
+    rng = random.Random(1)
+    opens = rng.choices(tokens, weights, k=args.clicks)
+    for i in range(len(opens)):
+        if rng.random() < args.invalid:
+            opens[i] = f"bad{rng.randrange(500):011}"
+
+    fake.calls.clear()
+    valid = 0
+    for token in opens:
+        if await db.resolve_file_token(token):
+            valid += 1
+    await db.stop_click_flusher()
+
+    calls = dict(fake.calls)
+    total = sum(calls.values())
+    stats = db.token_cache.stats()
+    stored = sum([doc["clicks"] async for doc in db.file_tokens.find({})])
+    print(f"{args.clicks} opens, {valid} valid, across {args.tokens} tokens")
+    print(f"round-trips/1k opens: {total * 1000 / args.clicks:.1f}  (before: 2000 for valid opens)")
+    for key in sorted(calls):
+        print(f"    {key:<32} {calls[key]}")
+    print(f"token cache: size={stats['size']} hit_ratio={stats['hit_ratio']:.1%} memory≈{db.token_cache.memory_bytes() / 1024:.0f} KiB")
+    print(f"stored clicks={stored} (expected {valid})")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
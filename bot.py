@@ -3,21 +3,36 @@
 
 from aiohttp import web
 import asyncio
-import time
 from plugins import web_server
 
 from pyrogram import Client
 from pyrogram.enums import ParseMode
 from pyrogram.errors import PeerIdInvalid, ChannelInvalid, RPCError
 import sys
+import time
 from datetime import datetime
 from config import LOGGER, PORT, OWNER_ID
 from helper import MongoDB
 from helper.enhanced_credit_db import EnhancedCreditDB
+from helper.cache import TTLCache
+from helper.broadcast import resume_broadcasts
+from helper.helper_func import create_http_session
+from helper.scheduler import DeleteScheduler
+from helper.batch_aggregator import BatchAggregator
+from helper.credit_expiry import CreditExpiry
 
 version = "v1.0.0"
 
 
+async def timed(timings: dict, phase: str, step):
+    """Await `step`, recording its wall time under `phase`."""
+    started = time.monotonic()
+    try:
+        return await step
+    finally:
+        timings[phase] = time.monotonic() - started
+
+
 class Bot(Client):
     def __init__(self, session, workers, db, fsub, token, admins, messages, auto_del, db_uri, db_name, api_id, api_hash, protect, disable_btn):
         super().__init__(
@@ -47,39 +62,141 @@ class Bot(Client):
         self.db_uri = db_uri  # Store for EnhancedCreditDB
         self.db_name = db_name  # Store for EnhancedCreditDB
         self.req_channels = []
+        self.member_cache = TTLCache(maxsize=50_000, ttl=300)  # (channel_id, user_id) -> joined status
+        self.fsub_semaphore = asyncio.Semaphore(8)  # Concurrent get_chat_member calls
+        self.message_cache = TTLCache(maxsize=20_000, ttl=3600)  # (chat_id, msg_id) -> FileDescriptor
+        self.http_session = None  # Shared aiohttp session, opened in start()
+        self.delete_scheduler = DeleteScheduler(self)  # Durable auto-delete queue
+        self.batch_aggregator = BatchAggregator(self)  # Debounced auto-batch groups
+        self.credit_expiry = CreditExpiry(self)  # Credit expiry + one-time warnings
     
     async def start(self):
-        await super().start()
-        usr_bot_me = await self.get_me()
+        started = time.monotonic()
+        timings = {}
+        await timed(timings, "connect", super().start())
+        self.http_session = create_http_session()
         self.uptime = datetime.now()
-        if len(self.fsub) > 0:
-            for channel in self.fsub:
-                try:
-                    chat = await self.get_chat(channel[0])
-                    name = chat.title
-                    link = None
-                    if not channel[1]:
-                        link = chat.invite_link
-                    if not link and not channel[2]:
-                        chat_link = await self.create_chat_invite_link(channel[0], creates_join_request=channel[1])
-                        link = chat_link.invite_link
-                    if not channel[1]:
-                        self.fsub_dict[channel[0]] = [name, link, False, 0]
-                    if channel[1]:
-                        self.fsub_dict[channel[0]] = [name, link, True, 0]
-                        self.req_channels.append(channel[0])
-                    if channel[2] > 0:
-                        self.fsub_dict[channel[0]] = [name, None, channel[1], channel[2]]
-                except Exception as e:
-                    self.LOGGER(__name__, self.name).warning("Bot can't Export Invite link from Force Sub Channel!")
-                    self.LOGGER(__name__, self.name).warning("\nBot Stopped.")
-                    await self.stop()
-                    return
-            await self.mongodb.set_channels(self.req_channels)
-
-        # -----------------------
-        # Robust DB channel check
-        # -----------------------
+
+        # The fail-fast probes run concurrently with work that leaves nothing running
+        # behind (idempotent index builds, config reads); results are applied below
+        # in a fixed order. Background tasks and migrations only start once both
+        # probes passed, so a failed probe stops a bot that has nothing in flight.
+        usr_bot_me, fsub_ok, db_ok, _, configs = await asyncio.gather(
+            self.get_me(),
+            timed(timings, "fsub", self._resolve_fsubs()),
+            timed(timings, "db channel", self._probe_db_channel()),
+            timed(timings, "indexes", self._ensure_indexes()),
+            timed(timings, "config", asyncio.gather(
+                self._load_bot_config(), self.mongodb.load_fsub_channels(), self.mongodb.load_admins(),
+                return_exceptions=True
+            ))
+        )
+        if not fsub_ok or not db_ok:
+            await self.stop()
+            return
+
+        self.mongodb.start_config_watcher()
+        await timed(timings, "migrations", self._run_migrations())
+
+        self.LOGGER(__name__, self.name).info("Bot Started!!")
+        
+        self.username = usr_bot_me.username
+
+        # 📌 Persisted ForceSub channels override setup.json defaults
+        _, saved_fsub, saved_admins = configs
+        if isinstance(saved_fsub, Exception):
+            self.LOGGER(__name__, self.name).warning(f"Failed to load fsub channels from DB: {saved_fsub}")
+        elif saved_fsub:
+            self.fsub_dict = saved_fsub
+            self.LOGGER(__name__, self.name).info(f"Loaded {len(saved_fsub)} fsub channels from DB.")
+
+        # 👑 Persisted Admin list overrides setup.json defaults, always keeps OWNER
+        if isinstance(saved_admins, Exception):
+            self.LOGGER(__name__, self.name).warning(f"Failed to load admins from DB: {saved_admins}")
+        elif saved_admins:
+            if OWNER_ID not in saved_admins:
+                saved_admins.append(OWNER_ID)
+            self.admins = saved_admins
+            self.LOGGER(__name__, self.name).info(f"Loaded {len(saved_admins)} admins from DB.")
+
+        # 📦 Flush auto-batch groups that were still collecting files when the bot stopped
+        try:
+            recovered = await timed(timings, "batch recovery", self.batch_aggregator.recover())
+            if recovered:
+                self.LOGGER(__name__, self.name).info(f"Recovered {recovered} pending auto-batch files.")
+        except Exception as e:
+            self.LOGGER(__name__, self.name).warning(f"Failed to recover pending auto-batch files: {e}")
+        
+        try:
+            self.delete_scheduler.start()
+            self.mongodb.start_click_flusher()
+            self.credit_expiry.start()
+            asyncio.create_task(resume_broadcasts(self))
+        except Exception as e:
+            self.LOGGER(__name__, self.name).warning(f"Failed to start background workers: {e}")
+
+        self.LOGGER(__name__, self.name).info(
+            f"Startup took {time.monotonic() - started:.2f}s: "
+            + ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in timings.items())
+            + " (fsub, db channel, indexes and config run concurrently)"
+        )
+
+    async def _resolve_fsubs(self) -> bool:
+        """Fill fsub_dict/req_channels from setup.json, reusing invite links cached in MongoDB."""
+        if not self.fsub:
+            return True
+        try:
+            cached = await self.mongodb.load_fsub_links()
+        except Exception as e:
+            self.LOGGER(__name__, self.name).warning(f"Failed to load cached fsub links: {e}")
+            cached = {}
+        resolved = await asyncio.gather(*(
+            self._resolve_fsub(channel, cached.get(channel[0])) for channel in self.fsub
+        ))
+        if None in resolved:
+            self.LOGGER(__name__, self.name).warning("Bot can't Export Invite link from Force Sub Channel!")
+            self.LOGGER(__name__, self.name).warning("\nBot Stopped.")
+            return False
+
+        fresh = False
+        for channel, (name, link, is_fresh) in zip(self.fsub, resolved):
+            channel_id, request, timer = channel[0], channel[1], channel[2]
+            if timer > 0:
+                self.fsub_dict[channel_id] = [name, None, request, timer]
+            else:
+                self.fsub_dict[channel_id] = [name, link, bool(request), 0]
+            if request:
+                self.req_channels.append(channel_id)
+            cached[channel_id] = {'name': name, 'link': link, 'req': request}
+            fresh = fresh or is_fresh
+
+        writes = [self.mongodb.set_channels(self.req_channels)]
+        if fresh:
+            writes.append(self.mongodb.save_fsub_links(cached))
+        try:
+            await asyncio.gather(*writes)
+        except Exception as e:
+            self.LOGGER(__name__, self.name).warning(f"Failed to save fsub channels: {e}")
+        return True
+
+    async def _resolve_fsub(self, channel, cached: dict | None):
+        """(title, invite link, freshly resolved) for one setup.json fsub entry, or None on failure."""
+        channel_id, request, timer = channel[0], channel[1], channel[2]
+        if cached and cached.get('req') == request and (cached.get('link') or timer):
+            return cached['name'], cached['link'], False
+        try:
+            chat = await self.get_chat(channel_id)
+            link = None if request else chat.invite_link
+            if not link and not timer:
+                chat_link = await self.create_chat_invite_link(channel_id, creates_join_request=request)
+                link = chat_link.invite_link
+            return chat.title, link, True
+        except Exception as e:
+            self.LOGGER(__name__, self.name).warning(f"Force Sub Channel ({channel_id}): {e}")
+            return None
+
+    async def _probe_db_channel(self) -> bool:
+        """Robust DB channel check: load the channel and round-trip a test message."""
         try:
             db_channel = None
             # Try to fetch chat with a few retries to avoid PEER_ID_INVALID cache issues
@@ -104,8 +221,7 @@ class Bot(Client):
                     f"Unable to load DB channel after retries. Check that the bot is added to the channel and the ID is correct. Current value: {self.db}"
                 )
                 self.LOGGER(__name__, self.name).info("\nBot Stopped. Join https://t.me/Mortal_realm for support")
-                await self.stop()
-                return
+                return False
 
             self.db_channel = db_channel
             self.db_channel_id = db_channel.id  # Store for auto-batch
@@ -141,8 +257,7 @@ class Bot(Client):
                     f"Make sure the bot is actually a member/admin of the channel and has permission to send messages. Current value: {self.db}"
                 )
                 self.LOGGER(__name__, self.name).info("\nBot Stopped. Join https://t.me/Mortal_realm for support")
-                await self.stop()
-                return
+                return False
 
             # cleanup test message
             try:
@@ -150,6 +265,7 @@ class Bot(Client):
             except Exception:
                 # ignore deletion errors (permissions may differ), but continue
                 pass
+            return True
 
         except Exception as e:
             # fallback catch-all: log and stop gracefully
@@ -158,25 +274,41 @@ class Bot(Client):
                 f"Make Sure bot is Admin in DB Channel, and Double check the database channel Value, Current Value {self.db}"
             )
             self.LOGGER(__name__, self.name).info("\nBot Stopped. Join https://t.me/Mortal_realm for support")
-            await self.stop()
-            return
+            return False
 
-        # -----------------------
-        # End DB channel check
-        # -----------------------
+    async def _ensure_indexes(self):
+        # 🔐 Ensure MongoDB indexes (and TTL expiry) from the index manifest, once per database
+        try:
+            rebuilt = await self.mongodb.ensure_indexes_once()
+            self.LOGGER(__name__, self.name).info(f"MongoDB indexes ensured ({rebuilt} rebuilt).")
+        except Exception as e:
+            self.LOGGER(__name__, self.name).warning(f"Failed to create MongoDB indexes: {e}")
 
-        self.LOGGER(__name__, self.name).info("Bot Started!!")
-        
-        self.username = usr_bot_me.username
-        
-        # 🔐 Ensure MongoDB indexes for hybrid token system
+    async def _run_migrations(self):
+        # 📦 One-off data migrations (each a no-op once migrated)
+        await asyncio.gather(
+            self._migrate("fsub join records", self.mongodb.migrate_fsub_members()),
+            self._migrate("credit transactions", EnhancedCreditDB(self.db_uri, self.db_name).migrate_transactions()),
+            self._migrate("broadcast TTL jobs", self.mongodb.migrate_broadcast_jobs(self.name))
+        )
+
+    async def _migrate(self, what: str, migration):
+        try:
+            migrated = await migration
+            if migrated:
+                self.LOGGER(__name__, self.name).info(f"Migrated {migrated} {what}.")
+        except Exception as e:
+            self.LOGGER(__name__, self.name).warning(f"Failed to migrate {what}: {e}")
+
+    async def _load_bot_config(self):
+        # ⚡ Warm the bot_config cache (the watcher keeping it in sync starts after the probes)
         try:
-            await self.mongodb.ensure_token_indexes()
-            self.LOGGER(__name__, self.name).info("Token indexes ensured.")
+            loaded = await self.mongodb.load_bot_config()
+            self.LOGGER(__name__, self.name).info(f"Bot config cache loaded ({loaded} keys).")
         except Exception as e:
-            self.LOGGER(__name__, self.name).warning(f"Failed to create token indexes: {e}")
-            
-        # 🔄 Load Dynamic Configs (Auto-Del, ForceSub, Admins)
+            self.LOGGER(__name__, self.name).warning(f"Failed to load bot config cache: {e}")
+
+        # 🔄 Dynamic Auto-Del
         try:
             stored_auto_del = await self.mongodb.get_bot_config('auto_del')
             if stored_auto_del is not None:
@@ -184,105 +316,17 @@ class Bot(Client):
                 self.LOGGER(__name__, self.name).info(f"Loaded Auto-Del from DB: {self.auto_del}s")
         except Exception as e:
              self.LOGGER(__name__, self.name).warning(f"Failed to load auto_del config: {e}")
-        
-        # 📌 Load persisted ForceSub channels (overrides setup.json defaults)
-        try:
-            saved_fsub = await self.mongodb.load_fsub_channels()
-            if saved_fsub:
-                self.fsub_dict = saved_fsub
-                self.LOGGER(__name__, self.name).info(f"Loaded {len(saved_fsub)} fsub channels from DB.")
-        except Exception as e:
-            self.LOGGER(__name__, self.name).warning(f"Failed to load fsub channels from DB: {e}")
-        
-        # 👑 Load persisted Admin list (overrides setup.json defaults, always keeps OWNER)
-        try:
-            saved_admins = await self.mongodb.load_admins()
-            if saved_admins:
-                # Always ensure owner is in the list
-                if OWNER_ID not in saved_admins:
-                    saved_admins.append(OWNER_ID)
-                self.admins = saved_admins
-                self.LOGGER(__name__, self.name).info(f"Loaded {len(saved_admins)} admins from DB.")
-        except Exception as e:
-            self.LOGGER(__name__, self.name).warning(f"Failed to load admins from DB: {e}")
-        
-        try:
-            asyncio.create_task(self._broadcast_ttl_worker())
-            asyncio.create_task(self._credit_expiry_worker())
-        except Exception as e:
-            self.LOGGER(__name__, self.name).warning(f"Failed to start background workers: {e}")
-
 
     async def stop(self, *args):
+        try:
+            await self.mongodb.stop_click_flusher()
+        except Exception as e:
+            self.LOGGER(__name__, self.name).warning(f"Failed to flush token clicks: {e}")
+        if self.http_session and not self.http_session.closed:
+            await self.http_session.close()
         await super().stop()
         self.LOGGER(__name__, self.name).info("Bot stopped.")
 
-    async def _broadcast_ttl_worker(self):
-        """Periodically checks MongoDB for due broadcast TTL jobs and deletes messages."""
-        while True:
-            try:
-                now_ts = int(time.time())
-                jobs = await self.mongodb.get_due_broadcast_jobs(now_ts, limit=200)
-                if not jobs:
-                    await asyncio.sleep(5)
-                    continue
-                for job in jobs:
-                    chat_id = job.get('chat_id')
-                    msg_id = job.get('message_id')
-                    job_id = job.get('_id')
-                    try:
-                        await self.delete_messages(chat_id=chat_id, message_ids=msg_id)
-                    except Exception as e:
-                        self.LOGGER(__name__, self.name).warning(f"TTL delete failed for {chat_id}/{msg_id}: {e}")
-                    finally:
-                        try:
-                            await self.mongodb.remove_broadcast_job(job_id)
-                        except Exception as ex:
-                            self.LOGGER(__name__, self.name).warning(f"Failed to remove TTL job {job_id}: {ex}")
-                await asyncio.sleep(1)
-            except Exception as loop_err:
-                self.LOGGER(__name__, self.name).warning(f"TTL worker error: {loop_err}")
-                await asyncio.sleep(5)
-    
-    async def _credit_expiry_worker(self):
-        """Periodically checks and removes expired credits"""
-        while True:
-            try:
-                from helper.enhanced_credit_db import EnhancedCreditDB
-                enhanced_db = EnhancedCreditDB(self.db_uri, self.db_name)
-                
-                # Cleanup expired credits every hour
-                count = await enhanced_db.cleanup_all_expired()
-                if count > 0:
-                    self.LOGGER(__name__, self.name).info(f"Credit expiry cleanup: removed {count} expired accounts")
-                
-                # Check for credits expiring in 24 hours and warn users
-                expiring_soon = await enhanced_db.get_expiring_soon(hours=24)
-                for user_data in expiring_soon:
-                    user_id = user_data["_id"]
-                    balance = user_data.get("balance", 0)
-                    expiry = user_data.get("expiry")
-                    
-                    if expiry:
-                        try:
-                            from helper.font_converter import sc
-                            await self.send_message(
-                                user_id,
-                                f"⚠️ **{sc('credit expiry warning')}!**\\n\\n"
-                                f"{sc('your')} **{balance} {sc('credits')}** {sc('will expire soon')}!\\n"
-                                f"⏰ {sc('expires')}: {expiry.strftime('%Y-%m-%d %H:%M')}\\n\\n"
-                                f"{sc('use them before they expire')}!"
-                            )
-                        except:
-                            pass
-                
-                # Sleep for 1 hour
-                await asyncio.sleep(3600)
-                
-            except Exception as loop_err:
-                self.LOGGER(__name__, self.name).warning(f"Credit expiry worker error: {loop_err}")
-                await asyncio.sleep(300)  # 5 minutes on error
-
 
 async def web_app():
     app = web.AppRunner(await web_server())
@@ -6,6 +6,25 @@ PORT = '8080'
 OWNER_ID = 1234567890
 MSG_EFFECT = 5046509860389126442
 
+# Broadcast engine: concurrent senders and global messages/sec (Telegram allows ~30/s per bot)
+BROADCAST_WORKERS = 20
+BROADCAST_RATE = 25
+# Auto-delete scheduler: chats cleaned concurrently and delete_messages calls/sec
+DELETE_WORKERS = 8
+DELETE_RATE = 20
+# Credit expiry warnings: concurrent senders and messages/sec
+EXPIRY_WARN_WORKERS = 8
+EXPIRY_WARN_RATE = 20
+# Auto-batch: post a group's batch once no new file has joined it for this many seconds
+AUTO_BATCH_QUIET = 3
+# MongoDB: one shared client per URI (helper/connections.py). Compressors are tried
+# in order and only used if installed (zstd: `zstandard`, snappy: `python-snappy`).
+MONGO_MAX_POOL_SIZE = 50
+MONGO_MIN_POOL_SIZE = 0
+MONGO_MAX_IDLE_MS = 300_000
+MONGO_COMPRESSORS = ["zstd", "snappy", "zlib"]
+MONGO_READ_PREFERENCE = "primary"
+
 # VPLink URL Shortener Configuration
 VPLINK_API_TOKEN = ""
 VPLINK_API_URL = "https://vplink.in/api"
@@ -17,9 +36,14 @@ URL_SHORTENERS = {
         'api_url': 'https://vplink.in/api',
         'api_token': VPLINK_API_TOKEN,
         'format': 'text',
+        'timeout': 10,  # Seconds for the whole request
+        'connect_timeout': 3,
         'active': True
     }
 }
+# Start the next-best shortener if the best one hasn't answered after this many seconds
+SHORTENER_HEDGE = True
+SHORTENER_HEDGE_DELAY = 1.5
 
 def LOGGER(name: str, client_name: str) -> logging.Logger:
     logger = logging.getLogger(name)
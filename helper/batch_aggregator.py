@@ -0,0 +1,131 @@
+import asyncio
+import time
+import humanize
+from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from config import AUTO_BATCH_QUIET
+from helper.font_converter import to_small_caps as sc
+from helper.quality_detector import get_quality_priority
+
+
+class _Group:
+    __slots__ = ('channel_id', 'name', 'mode', 'files', 'first_seen', 'last_seen', 'task')
+
+    def __init__(self, channel_id: int, name: str, mode: str):
+        self.channel_id = channel_id
+        self.name = name
+        self.mode = mode
+        self.files = []
+        self.first_seen = self.last_seen = time.monotonic()
+        self.task = None
+
+
+class BatchAggregator:
+    """
+    Groups quality variants / episodes posted to a channel into one batch.
+
+    Files collect in memory per (channel, group key). Each group has a single
+    flush task that fires once no new file has arrived for `quiet` seconds,
+    or `auto_batch_time_window` seconds after the first file, whichever comes
+    first. Groups of two or more files become one batch; lone files are
+    dropped. Every file is also journaled to `pending_files` so groups that
+    were still open when the bot stopped are flushed by `recover()`.
+    """
+
+    def __init__(self, client, quiet: float = AUTO_BATCH_QUIET):
+        self.client = client
+        self.quiet = quiet
+        self._groups = {}  # (channel_id, group_key) -> _Group
+
+    async def add(self, channel_id: int, group_key: str, mode: str, file: dict):
+        """Queue `file` ({file_id, filename, quality, user_id}) into its group."""
+        file = dict(file, channel_id=channel_id, group_key=group_key, mode=mode)
+        try:
+            file['_id'] = await self.client.mongodb.add_pending_file(file)
+        except Exception as e:
+            self.client.LOGGER(__name__, self.client.name).warning(f"Auto-batch journal write failed: {e}")
+        self._track(file)
+
+    async def recover(self) -> int:
+        """Reload journaled files from before a restart and flush their groups."""
+        files = await self.client.mongodb.get_pending_files()
+        for file in files:
+            if file.get('group_key'):
+                self._track(file)
+            else:
+                await self.client.mongodb.remove_pending_files([file['_id']])  # Pre-aggregator entry
+        return len(files)
+
+    def _track(self, file: dict):
+        key = (file['channel_id'], file['group_key'])
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = _Group(file['channel_id'], file['group_key'], file['mode'])
+        group.files.append(file)
+        group.last_seen = time.monotonic()
+        if group.task is None:
+            group.task = asyncio.create_task(self._flush_when_quiet(key, group))
+
+    async def _flush_when_quiet(self, key, group: _Group):
+        max_wait = await self.client.mongodb.get_bot_config('auto_batch_time_window', 30)
+        while True:
+            due = min(group.last_seen + self.quiet, group.first_seen + max_wait)
+            delay = due - time.monotonic()
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)  # New files only move last_seen; this task re-checks it
+        self._groups.pop(key, None)
+        try:
+            await self._flush(group)
+        except Exception as e:
+            self.client.LOGGER(__name__, self.client.name).warning(f"Auto-batch flush failed for {group.name}: {e}")
+
+    async def _flush(self, group: _Group):
+        files = group.files
+        journal_ids = [f['_id'] for f in files if f.get('_id') is not None]
+        if len(files) >= 2:
+            files.sort(key=lambda f: int(f['file_id']))  # Channel order first
+            if group.mode == 'episode':
+                files.sort(key=lambda f: get_quality_priority(f['quality']))
+            else:
+                files.sort(key=lambda f: f['filename'])
+            batch_id = await self.client.mongodb.create_batch(group.name, [
+                {
+                    'file_id': f['file_id'],
+                    'filename': f['filename'],
+                    'quality': f['quality'],
+                    'channel_id': f['channel_id']
+                }
+                for f in files
+            ])
+            await self._announce(group, files, batch_id)
+        if journal_ids:
+            await self.client.mongodb.remove_pending_files(journal_ids)
+
+    async def _announce(self, group: _Group, files: list, batch_id: str):
+        if group.mode == 'episode':
+            display_info = " | ".join([f['quality'] for f in files])
+            title_text = f"**{sc('qualities')}:** {display_info}"
+        else:
+            display_info = f"{len(files)} Episodes"
+            title_text = f"**{sc('content')}:** {display_info}"
+
+        timer_text = ""
+        if self.client.auto_del > 0:
+            timer_text = f"⏳ **{sc('auto delete')}:** {humanize.naturaldelta(self.client.auto_del)}\n"
+
+        batch_text = (
+            f"**📦 {sc('batch available')}**\n\n"
+            f"**{sc('title')}:** {group.name}\n"
+            f"{title_text}\n"
+            f"{timer_text}\n"
+            f"{sc('click below to access')}"
+        )
+        batch_button = InlineKeyboardMarkup([
+            [InlineKeyboardButton(f"📦 {sc('get batch')}", url=f"https://t.me/{self.client.username}?start=batch_{batch_id}")]
+        ])
+        await self.client.send_message(
+            chat_id=group.channel_id,
+            text=batch_text,
+            reply_markup=batch_button,
+            reply_to_message_id=max(int(f['file_id']) for f in files)
+        )
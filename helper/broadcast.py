@@ -0,0 +1,192 @@
+import asyncio
+import time
+from datetime import datetime
+from pyrogram.errors import FloodWait, UserIsBlocked, InputUserDeactivated
+from config import BROADCAST_WORKERS, BROADCAST_RATE
+from helper.ratelimit import TokenBucket
+
+# Keep references so running broadcasts aren't garbage collected
+_running = set()
+
+
+class BroadcastEngine:
+    """
+    Sends one stored message to every user with a pool of concurrent senders.
+
+    Users are streamed in _id order and sent a page at a time; after each page
+    the cursor and counters are saved to `broadcast_runs`, so a restarted bot
+    resumes from the last finished page instead of starting over.
+    """
+
+    def __init__(self, client, run: dict, workers: int = BROADCAST_WORKERS,
+                 rate: float = BROADCAST_RATE, page_size: int = 200, progress_interval: int = 10):
+        self.client = client
+        self.run = run
+        self.counters = dict(run.get('counters') or {
+            'total': 0, 'successful': 0, 'blocked': 0, 'deleted': 0, 'unsuccessful': 0
+        })
+        self.cursor = run.get('cursor', 0)
+        self.bucket = TokenBucket(rate)
+        self.semaphore = asyncio.Semaphore(workers)
+        self.page_size = page_size
+        self.progress_interval = progress_interval
+        self._last_progress = 0.0
+
+    @classmethod
+    async def create(cls, client, from_chat_id: int, message_id: int, action: str,
+                     ttl_seconds: int, status_chat_id: int, status_message_id: int, **kwargs):
+        run = {
+            'bot': client.name,
+            'from_chat_id': from_chat_id,
+            'message_id': message_id,
+            'action': action,
+            'ttl': ttl_seconds,
+            'status_chat_id': status_chat_id,
+            'status_message_id': status_message_id,
+            'cursor': 0,
+            'counters': None,
+            'status': 'running',
+            'started': datetime.now()
+        }
+        run['_id'] = await client.mongodb.create_broadcast_run(run)
+        return cls(client, run, **kwargs)
+
+    def start(self) -> asyncio.Task:
+        task = asyncio.create_task(self._execute_safely())
+        _running.add(task)
+        task.add_done_callback(_running.discard)
+        return task
+
+    async def _execute_safely(self):
+        """execute(), but a crash is logged, reported to the admin and marks the run failed."""
+        try:
+            await self.execute()
+        except asyncio.CancelledError:
+            raise  # Shutdown: the run stays 'running' and resumes on restart
+        except Exception as e:
+            self.client.LOGGER(__name__, self.client.name).error(f"Broadcast {self.run['_id']} failed: {e}")
+            try:
+                await self.client.mongodb.update_broadcast_run(self.run['_id'], {
+                    'status': 'failed', 'error': str(e), 'cursor': self.cursor,
+                    'counters': self.counters, 'finished': datetime.now()
+                })
+            except Exception as db_e:
+                self.client.LOGGER(__name__, self.client.name).warning(f"Failed to mark broadcast {self.run['_id']} failed: {db_e}")
+            await self._edit_status(self.status_text(done=True, error=e))
+
+    async def execute(self):
+        mongodb = self.client.mongodb
+        page = []
+        async for user_id in mongodb.iter_user_ids(batch_size=self.page_size, after_id=self.cursor):
+            page.append(user_id)
+            if len(page) >= self.page_size:
+                await self._send_page(page)
+                page = []
+        if page:
+            await self._send_page(page)
+
+        await mongodb.update_broadcast_run(self.run['_id'], {
+            'status': 'done', 'counters': self.counters, 'finished': datetime.now()
+        })
+        await self._edit_status(self.status_text(done=True))
+
+    async def _send_page(self, user_ids: list):
+        mongodb = self.client.mongodb
+        ttl_jobs = []
+        await asyncio.gather(*(self._deliver(uid, ttl_jobs) for uid in user_ids))
+        if ttl_jobs:
+            try:
+                await self.client.delete_scheduler.schedule_many(ttl_jobs)
+            except Exception as e:
+                self.client.LOGGER(__name__, self.client.name).warning(f"Failed to persist broadcast TTL jobs: {e}")
+        self.cursor = user_ids[-1]
+        await mongodb.update_broadcast_run(self.run['_id'], {'cursor': self.cursor, 'counters': self.counters})
+        await self._report_progress()
+
+    async def _deliver(self, chat_id: int, ttl_jobs: list):
+        async with self.semaphore:
+            result = 'unsuccessful'
+            sent = None
+            for _ in range(3):
+                await self.bucket.acquire()
+                try:
+                    sent = await self.client.copy_message(chat_id, self.run['from_chat_id'], self.run['message_id'])
+                    if self.run['ttl']:
+                        ttl_jobs.append({
+                            'chat_id': chat_id,
+                            'message_ids': [sent.id],
+                            'due_ts': int(time.time()) + int(self.run['ttl'])
+                        })
+                    result = 'successful'
+                    break
+                except FloodWait as e:
+                    # Global limit hit: every sender waits, then this user is retried
+                    self.bucket.pause(getattr(e, 'value', 1) or 1)
+                except UserIsBlocked:
+                    await self.client.mongodb.del_user(chat_id)
+                    result = 'blocked'
+                    break
+                except InputUserDeactivated:
+                    await self.client.mongodb.del_user(chat_id)
+                    result = 'deleted'
+                    break
+                except Exception as e:
+                    self.client.LOGGER(__name__, self.client.name).warning(f"Failed to send broadcast to {chat_id}: {e}")
+                    break
+            self.counters[result] += 1
+            self.counters['total'] += 1
+            # Pinning happens after delivery is recorded, so it can never resend the message
+            if sent and self.run['action'] == 'pin':
+                await self._pin(chat_id, sent.id)
+
+    async def _pin(self, chat_id: int, message_id: int):
+        """Pin a delivered copy. Never raises: a failed pin doesn't undo the delivery."""
+        both_sides = True
+        for _ in range(3):
+            await self.bucket.acquire()
+            try:
+                if both_sides:
+                    await self.client.pin_chat_message(chat_id=chat_id, message_id=message_id, both_sides=True)
+                else:
+                    await self.client.pin_chat_message(chat_id=chat_id, message_id=message_id)
+                return
+            except FloodWait as e:
+                self.bucket.pause(getattr(e, 'value', 1) or 1)
+            except Exception as e:
+                if not both_sides:
+                    self.client.LOGGER(__name__, self.client.name).warning(f"Failed to pin broadcast for {chat_id}: {e}")
+                    return
+                both_sides = False  # Fallback without both_sides if not supported
+
+    async def _report_progress(self):
+        now = time.monotonic()
+        if now - self._last_progress < self.progress_interval:
+            return
+        self._last_progress = now
+        await self._edit_status(self.status_text(done=False))
+
+    async def _edit_status(self, text: str):
+        try:
+            await self.client.edit_message_text(self.run['status_chat_id'], self.run['status_message_id'], text)
+        except Exception:
+            pass  # Message deleted or unchanged
+
+    def status_text(self, done: bool, error: Exception | None = None) -> str:
+        c = self.counters
+        title = "Broadcast Failed" if error else "Broadcast Completed" if done else "Broadcasting..."
+        failure = f"\n<blockquote><b>Error :</b> <code>{error}</code></blockquote>" if error else ""
+        return f"""<blockquote><b><u>{title}</u></b></blockquote>
+<blockquote expandable><b>Total Users :</b> <code>{c['total']}</code>
+<b>Successful :</b> <code>{c['successful']}</code>
+<b>Blocked Users :</b> <code>{c['blocked']}</code>
+<b>Deleted Accounts :</b> <code>{c['deleted']}</code>
+<b>Unsuccessful :</b> <code>{c['unsuccessful']}</code></blockquote>{failure}"""
+
+
+async def resume_broadcasts(client):
+    """Restart broadcasts that were interrupted by a restart (call once on startup)."""
+    runs = await client.mongodb.get_active_broadcast_runs(client.name)
+    for run in runs:
+        client.LOGGER(__name__, client.name).info(f"Resuming broadcast {run['_id']} after user {run.get('cursor', 0)}")
+        BroadcastEngine(client, run).start()
+    return len(runs)
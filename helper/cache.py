@@ -0,0 +1,71 @@
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class TTLCache:
+    """Small LRU cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default=None):
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None):
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable, default=None):
+        entry = self._data.pop(key, None)
+        return entry[1] if entry else default
+
+    def clear(self):
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and entry[0] >= time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def memory_bytes(self) -> int:
+        """Approximate footprint: the dict plus each key, entry and value (tuple values one level deep)."""
+        size = sys.getsizeof(self._data)
+        for key, entry in self._data.items():
+            value = entry[1]
+            size += sys.getsizeof(key) + sys.getsizeof(entry) + sys.getsizeof(value)
+            if isinstance(value, tuple):
+                size += sum(sys.getsizeof(item) for item in value)
+        return size
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': self.hits / lookups if lookups else 0.0
+        }
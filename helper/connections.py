@@ -0,0 +1,98 @@
+import importlib.util
+from urllib.parse import urlsplit
+import motor.motor_asyncio
+from pymongo import monitoring
+from config import (
+    MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_MAX_IDLE_MS,
+    MONGO_COMPRESSORS, MONGO_READ_PREFERENCE
+)
+
+# Python module each wire compressor needs; zlib ships with Python
+_COMPRESSOR_MODULES = {'zstd': 'zstandard', 'snappy': 'snappy', 'zlib': 'zlib'}
+
+_clients = {}  # uri -> AsyncIOMotorClient
+_pool_stats = {}  # uri -> PoolStats
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Connection counts for one client, fed by pymongo's connection pool events."""
+
+    def __init__(self):
+        self.open = 0
+        self.checked_out = 0
+        self.created = 0
+        self.closed = 0
+        self.checkout_failures = 0
+
+    def connection_created(self, event):
+        self.open += 1
+        self.created += 1
+
+    def connection_closed(self, event):
+        self.open -= 1
+        self.closed += 1
+
+    def connection_checked_out(self, event):
+        self.checked_out += 1
+
+    def connection_checked_in(self, event):
+        self.checked_out -= 1
+
+    def connection_check_out_failed(self, event):
+        self.checkout_failures += 1
+
+    # Pool-level events carry nothing we count
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_check_out_started(self, event): pass
+
+    def as_dict(self) -> dict:
+        return {
+            'open': self.open,
+            'checked_out': self.checked_out,
+            'created': self.created,
+            'closed': self.closed,
+            'checkout_failures': self.checkout_failures
+        }
+
+
+def available_compressors() -> list[str]:
+    """MONGO_COMPRESSORS whose Python package is installed, in preference order."""
+    return [
+        name for name in MONGO_COMPRESSORS
+        if importlib.util.find_spec(_COMPRESSOR_MODULES.get(name, name)) is not None
+    ]
+
+
+def get_mongo_client(uri: str) -> motor.motor_asyncio.AsyncIOMotorClient:
+    """
+    The process-wide client for `uri`. Every bot and data-access class on the
+    same cluster shares one connection pool instead of opening its own.
+    """
+    client = _clients.get(uri)
+    if client is None:
+        stats = PoolStats()
+        options = {
+            'maxPoolSize': MONGO_MAX_POOL_SIZE,
+            'minPoolSize': MONGO_MIN_POOL_SIZE,
+            'maxIdleTimeMS': MONGO_MAX_IDLE_MS,
+            'readPreference': MONGO_READ_PREFERENCE,
+            'event_listeners': [stats]
+        }
+        compressors = available_compressors()
+        if compressors:
+            options['compressors'] = compressors
+        client = _clients[uri] = motor.motor_asyncio.AsyncIOMotorClient(uri, **options)
+        _pool_stats[uri] = stats
+    return client
+
+
+def pool_stats() -> dict:
+    """Per-cluster connection counts, keyed by host (credentials stripped)."""
+    return {
+        (urlsplit(uri).hostname or uri): _pool_stats[uri].as_dict()
+        for uri in _clients
+    }
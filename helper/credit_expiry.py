@@ -0,0 +1,86 @@
+import asyncio
+from datetime import datetime
+from pyrogram.errors import FloodWait
+from config import EXPIRY_WARN_WORKERS, EXPIRY_WARN_RATE
+from helper.enhanced_credit_db import EnhancedCreditDB
+from helper.font_converter import to_small_caps as sc
+from helper.ratelimit import TokenBucket
+
+
+class CreditExpiry:
+    """
+    Expires credits and warns their holders once, 24h ahead.
+
+    Both jobs walk the `expiry` index in keyset-paginated chunks, so a pass
+    only touches users whose credits are actually due. Each user is claimed
+    with a `warned_at` marker before the warning goes out, so nobody is
+    warned twice for the same expiry date, even across restarts. Warnings
+    are sent concurrently under a shared rate limit. Between passes the
+    worker sleeps until the next expiry date, checking at least every
+    `max_sleep` seconds for newly expiring credits.
+    """
+
+    def __init__(self, client, warn_hours: int = 24, max_sleep: int = 900,
+                 workers: int = EXPIRY_WARN_WORKERS, rate: float = EXPIRY_WARN_RATE):
+        self.client = client
+        self.db = EnhancedCreditDB(client.db_uri, client.db_name)
+        self.warn_hours = warn_hours
+        self.max_sleep = max_sleep
+        self.semaphore = asyncio.Semaphore(workers)
+        self.bucket = TokenBucket(rate)
+        self._task = None
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._worker())
+        return self._task
+
+    async def run_once(self) -> tuple[int, int]:
+        """Expire due credits, then warn users whose credits expire soon. Returns (expired, warned)."""
+        expired = await self.db.cleanup_all_expired()
+        warned = 0
+        async for page in self.db.iter_expiring_soon(self.warn_hours):
+            claimed = set(await self.db.mark_warned([doc["_id"] for doc in page]))
+            results = await asyncio.gather(*(
+                self._warn(doc["_id"], doc.get("balance", 0), doc["expiry"])
+                for doc in page if doc["_id"] in claimed
+            ))
+            warned += sum(results)
+        return expired, warned
+
+    async def _worker(self):
+        log = self.client.LOGGER(__name__, self.client.name)
+        while True:
+            try:
+                expired, warned = await self.run_once()
+                if expired or warned:
+                    log.info(f"Credit expiry: {expired} accounts expired, {warned} users warned")
+                next_expiry = await self.db.next_expiry()
+                delay = self.max_sleep
+                if next_expiry:
+                    delay = min(delay, max((next_expiry - datetime.now()).total_seconds(), 1))
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning(f"Credit expiry worker error: {e}")
+                await asyncio.sleep(300)
+
+    async def _warn(self, user_id: int, balance: int, expiry: datetime) -> bool:
+        text = (
+            f"⚠️ **{sc('credit expiry warning')}!**\n\n"
+            f"{sc('your')} **{balance} {sc('credits')}** {sc('will expire soon')}!\n"
+            f"⏰ {sc('expires')}: {expiry.strftime('%Y-%m-%d %H:%M')}\n\n"
+            f"{sc('use them before they expire')}!"
+        )
+        async with self.semaphore:
+            for _ in range(3):
+                await self.bucket.acquire()
+                try:
+                    await self.client.send_message(user_id, text)
+                    return True
+                except FloodWait as e:
+                    self.bucket.pause(getattr(e, 'value', 1) or 1)
+                except Exception:
+                    return False  # Blocked the bot / deleted account
+        return False
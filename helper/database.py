@@ -1,6 +1,111 @@
-import motor.motor_asyncio
+import asyncio
+import logging
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure, PyMongoError
 from typing import Any
 from datetime import datetime, timedelta
+from helper.connections import get_mongo_client
+from helper.cache import TTLCache
+
+log = logging.getLogger(__name__)
+
+# bot_config document bumped on every set_bot_config so processes that can't
+# open a change stream (standalone mongod) can still notice foreign writes.
+CONFIG_VERSION_KEY = "__config_version__"
+
+# How long Mongo keeps expired / stale documents before its TTL monitor drops them
+ACCESS_TOKEN_RETENTION = 24 * 3600  # After `expires`
+RATE_LIMIT_RETENTION = 300  # After `window_start` (checks only look back 60s)
+BYPASS_LOG_RETENTION = 30 * 24 * 3600  # Auto-ban looks back 24h; the rest is for admin review
+PENDING_FILE_RETENTION = 24 * 3600  # Auto-batch journal entries never flushed
+
+# Every index the bot relies on: collection name -> [(name, keys, options)].
+# ensure_indexes() applies this on startup; an index whose options changed
+# (e.g. a new TTL) is dropped and rebuilt under the same name.
+INDEX_MANIFEST = {
+    'file_tokens': [
+        ('created_at_1', [('created_at', 1)], {}),
+    ],
+    'rate_limits': [
+        ('user_id_1_window_start_1', [('user_id', 1), ('window_start', 1)], {}),
+        ('window_start_1', [('window_start', 1)], {'expireAfterSeconds': RATE_LIMIT_RETENTION}),
+    ],
+    'access_tokens': [
+        ('user_id_1_token_1', [('user_id', 1), ('token', 1)], {}),
+        ('expires_1', [('expires', 1)], {'expireAfterSeconds': ACCESS_TOKEN_RETENTION}),
+    ],
+    'bypass_attempts': [
+        ('user_id_1_timestamp_1', [('user_id', 1), ('timestamp', 1)], {}),
+        ('timestamp_1', [('timestamp', 1)], {'expireAfterSeconds': BYPASS_LOG_RETENTION}),
+    ],
+    'pending_files': [
+        ('timestamp_1', [('timestamp', 1)], {'expireAfterSeconds': PENDING_FILE_RETENTION}),
+    ],
+    'batch_groups': [
+        ('batch_id_1', [('batch_id', 1)], {'unique': True}),
+    ],
+    'fsub_members': [
+        ('channel_id_1_user_id_1_kind_1', [('channel_id', 1), ('user_id', 1), ('kind', 1)], {'unique': True}),
+    ],
+    'delete_jobs': [
+        ('bot_1_due_ts_1', [('bot', 1), ('due_ts', 1)], {}),
+    ],
+    'enhanced_credits': [
+        ('expiry_1', [('expiry', 1)], {}),
+    ],
+    'credit_ledger': [
+        ('user_id_1_timestamp_-1', [('user_id', 1), ('timestamp', -1)], {}),
+    ],
+    'files': [
+        ('chat_id_1_msg_id_1', [('chat_id', 1), ('msg_id', 1)], {'unique': True}),
+        ('file_unique_id_1', [('file_unique_id', 1)], {}),
+        ('base_name_1', [('base_name', 1)], {}),
+    ],
+}
+
+# Indexes earlier versions created that the manifest replaces
+OBSOLETE_INDEXES = {
+    'file_tokens': ['token_1'],  # Unique on a missing field; caused duplicate null errors
+    'rate_limits': ['user_id_1'],  # Covered by user_id_1_window_start_1
+}
+
+# File-token clicks are counted in memory and written in one bulk_write per interval
+TOKEN_CLICK_FLUSH_INTERVAL = 30
+TOKEN_CLICK_BUFFER = 10_000  # Distinct tokens buffered before an early flush
+
+# file_tokens documents never change, so resolved links are cached; unknown tokens are cached briefly
+TOKEN_CACHE_SIZE = 50_000
+TOKEN_CACHE_TTL = 3600
+TOKEN_MISS_TTL = 300
+
+# OperationFailure codes create_index raises when an index of that name / keys exists with other options
+_INDEX_CONFLICT_CODES = (85, 86)
+
+
+class UserSession:
+    """Snapshot of everything the file-request path needs to know about a user."""
+    __slots__ = (
+        'user_id', 'is_new', 'banned', 'premium', 'premium_expire',
+        'balance', 'credit_expiry', 'credits_expired', 'total_spent', 'referred_by'
+    )
+
+    def __init__(self, user_id: int, user: dict | None, credits: dict | None, is_new: bool = False):
+        now = datetime.now()
+        user = user or {}
+        credits = credits or {}
+        self.user_id = user_id
+        self.is_new = is_new
+        self.banned = user.get('ban', False)
+        self.premium_expire = user.get('premium_expire')
+        self.premium = bool(user.get('is_premium', False)) and not (
+            self.premium_expire and now > self.premium_expire
+        )
+        self.credit_expiry = credits.get('expiry')
+        self.credits_expired = bool(self.credit_expiry and now > self.credit_expiry)
+        self.balance = 0 if self.credits_expired else credits.get('balance', 0)
+        self.total_spent = credits.get('total_spent', 0)
+        self.referred_by = credits.get('referred_by')
+
 
 class MongoDB:
     _instances = {}
@@ -13,18 +118,30 @@ class MongoDB:
     def __new__(cls, uri: str, db_name: str):
         if (uri, db_name) not in cls._instances:
             instance = super().__new__(cls)
-            instance.client = motor.motor_asyncio.AsyncIOMotorClient(uri)
+            instance.client = get_mongo_client(uri)
             instance.db = instance.client[db_name]
             instance.user_data = instance.db["users"]
             instance.channel_data = instance.db["channels"]
             instance.broadcast_jobs = instance.db["broadcast_jobs"]
+            instance.broadcast_runs = instance.db["broadcast_runs"]  # Resumable broadcast state
+            instance.delete_jobs = instance.db["delete_jobs"]  # Scheduled auto-deletes
             instance.access_tokens = instance.db["access_tokens"]  # Enhanced token tracking
             instance.bypass_attempts = instance.db["bypass_attempts"]  # Bypass logging
             instance.bot_config = instance.db["bot_config"]  # Bot configuration
             instance.batch_groups = instance.db["batch_groups"]  # Auto-batch groups
             instance.pending_files = instance.db["pending_files"]  # Files pending grouping
             instance.file_tokens = instance.db["file_tokens"]  # Hybrid token system
+            instance.files = instance.db["files"]  # Metadata of every DB-channel post
             instance.rate_limits = instance.db["rate_limits"]  # Rate limiting
+            instance.fsub_members = instance.db["fsub_members"]  # ForceSub join tracking
+            instance._config_cache = {}  # bot_config key -> value
+            instance._config_loaded = False
+            instance._config_watcher = None
+            instance.token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL)  # token -> link or False
+            instance._token_clicks = {}  # file token -> clicks not yet written
+            instance._click_flusher = None
+            instance._early_flush = None  # Flush started when the click buffer fills up
+            instance._index_task = None
             cls._instances[(uri, db_name)] = instance
         return cls._instances[(uri, db_name)]
 
@@ -152,8 +269,57 @@ class MongoDB:
     async def add_user(self, user_id: int, ban: bool = False):
         await self.user_data.insert_one({'_id': user_id, 'ban': ban})
 
-    async def full_userbase(self) -> list[int]:
-        return [doc['_id'] async for doc in self.user_data.find()]
+    async def iter_user_ids(self, batch_size: int = 500, after_id: int = 0, include_banned: bool = False):
+        """
+        Stream user IDs in _id order without loading the whole userbase.
+        Only `_id` is fetched and banned users are filtered out by the server.
+        """
+        # _id 1 and 2 hold the channel / admin lists, not users
+        query = {'_id': {'$gt': after_id, '$nin': [1, 2]}}
+        if not include_banned:
+            query['ban'] = {'$ne': True}
+        cursor = self.user_data.find(query, {'_id': 1}).sort('_id', 1).batch_size(batch_size)
+        async for doc in cursor:
+            yield doc['_id']
+
+    async def count_users(self) -> int:
+        """Approximate user count from collection metadata (no collection scan)."""
+        total, special = await asyncio.gather(
+            self.user_data.estimated_document_count(),
+            self.user_data.count_documents({'_id': {'$in': [1, 2]}})
+        )
+        return max(0, total - special)
+
+    async def get_user_session(self, user_id: int, register: bool = True, with_credits: bool = True) -> UserSession:
+        """
+        Load existence, ban, premium and credit state in one go.
+        The user upsert (when register=True) and the credit read run concurrently.
+        """
+        if register:
+            user_op = self.user_data.find_one_and_update(
+                {'_id': user_id},
+                {'$setOnInsert': {'ban': False}},
+                upsert=True,
+                return_document=ReturnDocument.BEFORE
+            )
+        else:
+            user_op = self.user_data.find_one({'_id': user_id})
+
+        if with_credits:
+            user, credits = await asyncio.gather(
+                user_op,
+                self.db["enhanced_credits"].find_one(
+                    {'_id': user_id},
+                    {'balance': 1, 'expiry': 1, 'total_spent': 1, 'referred_by': 1}
+                )
+            )
+        else:
+            user, credits = await user_op, None
+
+        session = UserSession(user_id, user, credits, is_new=register and user is None)
+        if user and user.get('is_premium') and not session.premium:
+            await self.remove_premium(user_id)
+        return session
 
     async def del_user(self, user_id: int):
         await self.user_data.delete_one({'_id': user_id})
@@ -211,18 +377,53 @@ class MongoDB:
     # HYBRID TOKEN LINK SYSTEM
     # =====================================================
 
-    async def ensure_token_indexes(self):
-        """Create MongoDB indexes for fast token lookup (call once on startup)."""
-        # Fix: Drop incorrect 'token' index if it exists (caused duplicate null error)
-        try:
-            await self.file_tokens.drop_index("token_1")
-        except:
-            pass
-            
-        # _id is automatically indexed and unique, so we don't need another unique index on token
-        await self.file_tokens.create_index("created_at")  # For TTL cleanup
-        await self.rate_limits.create_index("user_id")
-        await self.rate_limits.create_index("window_start")  # For cleanup
+    async def ensure_indexes(self) -> int:
+        """Apply INDEX_MANIFEST (call once on startup). Safe to re-run; returns indexes rebuilt."""
+        for collection, names in OBSOLETE_INDEXES.items():
+            for name in names:
+                try:
+                    await self.db[collection].drop_index(name)
+                except OperationFailure:
+                    pass  # Already gone
+
+        # Collections are independent, so build them concurrently
+        rebuilt = await asyncio.gather(*(
+            self._ensure_collection_indexes(self.db[name], indexes)
+            for name, indexes in INDEX_MANIFEST.items()
+        ))
+        return sum(rebuilt)
+
+    async def _ensure_collection_indexes(self, collection, indexes: list) -> int:
+        rebuilt = 0
+        for name, keys, options in indexes:
+            try:
+                await collection.create_index(keys, name=name, **options)
+            except OperationFailure as e:
+                if e.code not in _INDEX_CONFLICT_CODES:
+                    raise
+                await collection.drop_index(name)
+                await collection.create_index(keys, name=name, **options)
+                rebuilt += 1
+        return rebuilt
+
+    def ensure_indexes_once(self) -> asyncio.Future:
+        """ensure_indexes shared by every bot on this database; re-runs only after a failure."""
+        task = self._index_task
+        if task is None or (task.done() and (task.cancelled() or task.exception())):
+            self._index_task = asyncio.ensure_future(self.ensure_indexes())
+        return self._index_task
+
+    async def get_index_stats(self) -> dict:
+        """$indexStats for every collection in INDEX_MANIFEST: {collection: [{name, ops, since}]}."""
+        stats = {}
+        for collection in INDEX_MANIFEST:
+            cursor = self.db[collection].aggregate([{'$indexStats': {}}])
+            indexes = [
+                {'name': doc['name'], 'ops': doc['accesses']['ops'], 'since': doc['accesses']['since']}
+                async for doc in cursor
+            ]
+            stats[collection] = sorted(indexes, key=lambda index: index['ops'], reverse=True)
+        return stats
 
     async def create_file_token(self, channel_id: int, msg_id: int, is_batch: bool = False, end_msg_id: int = None) -> str:
         """Generate a unique random token and store it in MongoDB. Returns the token."""
@@ -244,19 +445,93 @@ class MongoDB:
                     "created_at": datetime.utcnow(),
                     "clicks": 0
                 })
+                self.token_cache.pop(token)  # In case someone already tried it
                 return token
             except Exception: # Duplicate key (_id collision)
                 continue
         raise RuntimeError("Failed to generate unique token after 10 attempts")
 
     async def resolve_file_token(self, token: str) -> dict | None:
-        """Resolve a token to {channel_id, msg_id}. Returns None if not found."""
-        await self.file_tokens.update_one(
-            {"_id": token},
-            {"$inc": {"clicks": 1}}
-        )
-        doc = await self.file_tokens.find_one({"_id": token})
-        return doc  # Returns full doc or None
+        """
+        Resolve a token to {channel_id, msg_id, end_msg_id, is_batch} and count the click.
+        Returns None if not found.
+
+        Links come from `token_cache` when possible, and clicks on cached links
+        only go to the in-memory click buffer, so a viral link costs no
+        round-trip at all. Unknown tokens are cached too, so invalid-token spam
+        doesn't reach Mongo either.
+        """
+        link = self.token_cache.get(token)
+        if link is False:
+            return None
+        if link is None:
+            doc = await self.file_tokens.find_one_and_update(
+                {"_id": token},
+                {"$inc": {"clicks": 1}},
+                projection={"channel_id": 1, "msg_id": 1, "end_msg_id": 1, "is_batch": 1},
+                return_document=ReturnDocument.AFTER
+            )
+            if not doc:
+                self.token_cache.set(token, False, ttl=TOKEN_MISS_TTL)
+                return None
+            link = (doc["channel_id"], doc["msg_id"], doc.get("end_msg_id"), doc.get("is_batch", False))
+            self.token_cache.set(token, link)
+        else:
+            self._token_clicks[token] = self._token_clicks.get(token, 0) + 1
+            if len(self._token_clicks) >= TOKEN_CLICK_BUFFER and (self._early_flush is None or self._early_flush.done()):
+                # Off the /start path: click accounting must never delay or fail a link
+                self._early_flush = asyncio.create_task(self._flush_clicks_logged())
+
+        channel_id, msg_id, end_msg_id, is_batch = link
+        return {"_id": token, "channel_id": channel_id, "msg_id": msg_id, "end_msg_id": end_msg_id, "is_batch": is_batch}
+
+    async def flush_token_clicks(self) -> int:
+        """Write buffered file-token clicks in one bulk_write. Returns tokens updated."""
+        clicks, self._token_clicks = self._token_clicks, {}
+        pending = [(token, n) for token, n in clicks.items() if n]
+        ops = [UpdateOne({"_id": token}, {"$inc": {"clicks": n}}) for token, n in pending]
+        if ops:
+            try:
+                await self.file_tokens.bulk_write(ops, ordered=False)
+            except BulkWriteError as e:
+                # Unordered: every op not listed in writeErrors has already been applied
+                failed = [pending[err["index"]] for err in e.details.get("writeErrors", [])]
+                self._requeue_clicks(failed)
+                raise
+            except PyMongoError:
+                self._requeue_clicks(pending)  # Keep them for the next flush
+                raise
+        return len(ops)
+
+    def _requeue_clicks(self, clicks: list[tuple[str, int]]):
+        for token, n in clicks:
+            self._token_clicks[token] = self._token_clicks.get(token, 0) + n
+
+    def start_click_flusher(self, interval: int = TOKEN_CLICK_FLUSH_INTERVAL):
+        """Start the periodic click flush task (once per MongoDB instance)."""
+        if self._click_flusher is None or self._click_flusher.done():
+            self._click_flusher = asyncio.create_task(self._flush_clicks_forever(interval))
+
+    async def stop_click_flusher(self):
+        """Stop the flush task and write whatever is still buffered (call on shutdown)."""
+        if self._click_flusher:
+            self._click_flusher.cancel()
+            self._click_flusher = None
+        if self._early_flush is not None:
+            await self._early_flush  # Let an in-flight early flush land first
+            self._early_flush = None
+        await self.flush_token_clicks()
+
+    async def _flush_clicks_forever(self, interval: int):
+        while True:
+            await asyncio.sleep(interval)
+            await self._flush_clicks_logged()
+
+    async def _flush_clicks_logged(self):
+        try:
+            await self.flush_token_clicks()
+        except PyMongoError as e:
+            log.warning(f"Token click flush failed, keeping clicks buffered: {e}")
 
     async def record_invalid_token_attempt(self, user_id: int):
         """Record an invalid token attempt for rate limiting."""
@@ -286,22 +561,43 @@ class MongoDB:
         return total >= max_attempts
 
     # =====================================================
-    # BROADCAST TTL JOBS
+    # SCHEDULED DELETES
     # =====================================================
 
-    async def add_broadcast_ttl_job(self, chat_id: int, message_id: int, delete_ts: int):
-        await self.broadcast_jobs.insert_one({
-            'chat_id': chat_id,
-            'message_id': message_id,
-            'delete_ts': delete_ts
-        })
-
-    async def get_due_broadcast_jobs(self, now_ts: int, limit: int = 200):
-        cursor = self.broadcast_jobs.find({'delete_ts': {'$lte': now_ts}}).limit(limit)
+    async def add_delete_jobs(self, jobs: list[dict]) -> list:
+        """Insert {bot, chat_id, message_ids, due_ts, ...} jobs in one round-trip. Returns their _ids."""
+        if not jobs:
+            return []
+        result = await self.delete_jobs.insert_many(jobs, ordered=False)
+        return result.inserted_ids
+
+    async def get_due_delete_jobs(self, bot_name: str, before_ts: int, limit: int = 1000) -> list:
+        """Jobs due at or before `before_ts`, soonest first."""
+        cursor = self.delete_jobs.find(
+            {'bot': bot_name, 'due_ts': {'$lte': before_ts}}
+        ).sort('due_ts', 1).limit(limit)
         return [doc async for doc in cursor]
 
-    async def remove_broadcast_job(self, job_id):
-        await self.broadcast_jobs.delete_one({'_id': job_id})
+    async def remove_delete_jobs(self, job_ids: list):
+        if job_ids:
+            await self.delete_jobs.delete_many({'_id': {'$in': job_ids}})
+
+    # =====================================================
+    # BROADCAST RUNS (RESUMABLE)
+    # =====================================================
+
+    async def create_broadcast_run(self, run: dict):
+        """Persist a new broadcast run. Returns its _id."""
+        result = await self.broadcast_runs.insert_one(run)
+        return result.inserted_id
+
+    async def update_broadcast_run(self, run_id, fields: dict):
+        await self.broadcast_runs.update_one({'_id': run_id}, {'$set': fields})
+
+    async def get_active_broadcast_runs(self, bot_name: str) -> list:
+        """Runs that were still in progress when this bot last stopped."""
+        cursor = self.broadcast_runs.find({'bot': bot_name, 'status': 'running'})
+        return [doc async for doc in cursor]
 
     # =====================================================
     # ENHANCED TOKEN ACCESS SYSTEM + ANTI-BYPASS
@@ -325,67 +621,58 @@ class MongoDB:
 
     async def verify_access_token(self, user_id: int, token: str, base64_string: str) -> str:
         """
-        Enhanced token verification with one-time use
+        Enhanced token verification with one-time use. Counts the shortener click too.
         Returns: OK, BYPASS, INVALID, ALREADY_USED, EXPIRED
-        """
-        token_data = await self.access_tokens.find_one({
-            'user_id': user_id,
-            'token': token,
-            'base64': base64_string
-        })
 
-        if not token_data:
-            await self.log_bypass_attempt(user_id, "INVALID_TOKEN")
-            return "INVALID"
-
-        # Check if token expired
-        if datetime.now() > token_data.get('expires', datetime.now()):
-            await self.log_bypass_attempt(user_id, "EXPIRED_TOKEN")
-            return "EXPIRED"
-
-        # Check if already used (one-time use)
-        if token_data.get('used', False):
-            await self.log_bypass_attempt(user_id, "TOKEN_REUSE")
-            return "ALREADY_USED"
+        The happy path is a single conditional write, so two concurrent clicks on
+        the same link can't both get OK. Only a failed click pays a second
+        round-trip to find out why.
+        """
+        now = datetime.now()
+        link = {'user_id': user_id, 'token': token, 'base64': base64_string}
+        conditions = {'used': False, 'expires': {'$gt': now}}
 
         # Check minimum solve time (Anti-Bypass)
         bypass_check_enabled = await self.get_bot_config('bypass_check_enabled', True)
         if bypass_check_enabled:
             bypass_timer = await self.get_bot_config('bypass_timer', 60)
-            created = token_data.get('created', datetime.now())
-            if datetime.now() < created + timedelta(seconds=bypass_timer):
-                await self.log_bypass_attempt(user_id, "BYPASS_ATTEMPT")
-                return "BYPASS"
+            conditions['created'] = {'$lte': now - timedelta(seconds=bypass_timer)}
 
         # Mark token as used
-        await self.access_tokens.update_one(
-            {'_id': token_data['_id']},
+        verified = await self.access_tokens.find_one_and_update(
+            {**link, **conditions},
             {
-                '$set': {'used': True, 'used_at': datetime.now()},
-                '$inc': {'use_count': 1}
-            }
+                '$set': {'used': True, 'used_at': now},
+                '$inc': {'use_count': 1, 'click_count': 1}
+            },
+            projection={'_id': 1}
         )
+        if verified:
+            return "OK"
 
-        return "OK"
+        token_data = await self.access_tokens.find_one_and_update(
+            link,
+            {'$inc': {'click_count': 1}},
+            projection={'used': 1, 'expires': 1, 'created': 1}
+        )
+
+        if not token_data:
+            result, attempt_type = "INVALID", "INVALID_TOKEN"
+        elif now > token_data.get('expires', now):
+            result, attempt_type = "EXPIRED", "EXPIRED_TOKEN"
+        elif token_data.get('used', False):
+            result, attempt_type = "ALREADY_USED", "TOKEN_REUSE"
+        elif bypass_check_enabled:
+            result, attempt_type = "BYPASS", "BYPASS_ATTEMPT"
+        else:
+            result, attempt_type = "EXPIRED", "EXPIRED_TOKEN"  # Expired between the two round-trips
+        await self.log_bypass_attempt(user_id, attempt_type)
+        return result
 
     async def clear_access_token(self, user_id: int):
         """Delete all tokens for user"""
         await self.access_tokens.delete_many({'user_id': user_id})
 
-    async def cleanup_old_tokens(self):
-        """Remove expired tokens"""
-        result = await self.access_tokens.delete_many({
-            'expires': {'$lt': datetime.now()}
-        })
-        return result.deleted_count
-
-    async def increment_token_clicks(self, user_id: int, token: str):
-        """Increment click count for a token"""
-        await self.access_tokens.update_one(
-            {'user_id': user_id, 'token': token},
-            {'$inc': {'click_count': 1}}
-        )
-
     async def get_shortener_stats(self):
         """Get shortener click statistics"""
         pipeline = [
@@ -478,18 +765,90 @@ class MongoDB:
     # BOT CONFIGURATION
     # =====================================================
 
+    async def load_bot_config(self) -> int:
+        """Load every bot_config value into the in-process cache. Returns number of keys."""
+        cache = {}
+        cursor = self.bot_config.find({'value': {'$exists': True}}, {'value': 1})
+        async for doc in cursor:
+            cache[doc['_id']] = doc['value']
+        self._config_cache = cache
+        self._config_loaded = True
+        return len(cache)
+
     async def get_bot_config(self, key: str, default=None):
-        """Get bot configuration value"""
+        """Get bot configuration value (served from memory once the cache is loaded)"""
+        if self._config_loaded:
+            return self._config_cache.get(key, default)
         config = await self.bot_config.find_one({'_id': key})
         return config.get('value', default) if config else default
 
     async def set_bot_config(self, key: str, value):
-        """Set bot configuration value"""
+        """Set bot configuration value (write-through to the cache)"""
         await self.bot_config.update_one(
             {'_id': key},
             {'$set': {'value': value, 'updated': datetime.now()}},
             upsert=True
         )
+        self._config_cache[key] = value
+        await self.bot_config.update_one(
+            {'_id': CONFIG_VERSION_KEY},
+            {'$inc': {'version': 1}},
+            upsert=True
+        )
+
+    def start_config_watcher(self, poll_interval: int = 30):
+        """Start the background cache invalidation task (once per MongoDB instance)."""
+        if self._config_watcher is None or self._config_watcher.done():
+            self._config_watcher = asyncio.create_task(self.watch_bot_config(poll_interval))
+
+    async def watch_bot_config(self, poll_interval: int = 30):
+        """
+        Keep the config cache in sync with writes made by other processes.
+        Uses a change stream when available, otherwise polls the version counter.
+        """
+        pipeline = [
+            {'$match': {'operationType': {'$in': ['insert', 'update', 'replace', 'delete']}}},
+            {'$project': {'operationType': 1, 'documentKey': 1, 'fullDocument.value': 1}}
+        ]
+        while True:
+            try:
+                async with self.bot_config.watch(pipeline, full_document='updateLookup') as stream:
+                    async for change in stream:
+                        self._apply_config_change(change)
+            except OperationFailure:
+                # Change streams need a replica set / sharded cluster
+                break
+            except PyMongoError:
+                await asyncio.sleep(5)
+                # Events may have been missed while the stream was down
+                try:
+                    await self.load_bot_config()
+                except PyMongoError:
+                    pass
+
+        version = await self._get_config_version()
+        while True:
+            await asyncio.sleep(poll_interval)
+            try:
+                current = await self._get_config_version()
+                if current != version:
+                    await self.load_bot_config()
+                    version = current
+            except PyMongoError:
+                pass
+
+    def _apply_config_change(self, change: dict):
+        key = change['documentKey']['_id']
+        if change['operationType'] == 'delete':
+            self._config_cache.pop(key, None)
+            return
+        doc = change.get('fullDocument') or {}
+        if 'value' in doc:
+            self._config_cache[key] = doc['value']
+
+    async def _get_config_version(self) -> int:
+        doc = await self.bot_config.find_one({'_id': CONFIG_VERSION_KEY})
+        return doc.get('version', 0) if doc else 0
 
     async def is_credit_system_enabled(self) -> bool:
         """Check if credit system is enabled"""
@@ -499,31 +858,56 @@ class MongoDB:
         """Enable/disable credit system"""
         await self.set_bot_config('credit_system_enabled', enabled)
 
+    # =====================================================
+    # FILE METADATA INDEX
+    # =====================================================
+    # One document per DB-channel post (chat_id, msg_id). Non-media posts are
+    # stored too (name=None) so range scans know they were already looked at.
+
+    async def upsert_files(self, records: list[dict]):
+        """Insert or refresh many file records in one round-trip."""
+        if not records:
+            return
+        await self.files.bulk_write([
+            UpdateOne({'chat_id': r['chat_id'], 'msg_id': r['msg_id']}, {'$set': r}, upsert=True)
+            for r in records
+        ], ordered=False)
+
+    async def remove_files(self, chat_id: int, msg_ids: list[int]) -> int:
+        """Forget records for posts deleted from `chat_id`; returns records removed."""
+        result = await self.files.delete_many({'chat_id': chat_id, 'msg_id': {'$in': list(msg_ids)}})
+        return result.deleted_count
+
+    async def get_files(self, chat_id: int, msg_ids: list[int]) -> dict:
+        """Indexed records for `msg_ids` in `chat_id`, keyed by msg_id (missing ids are absent)."""
+        cursor = self.files.find({'chat_id': chat_id, 'msg_id': {'$in': list(msg_ids)}})
+        return {doc['msg_id']: doc async for doc in cursor}
+
+    async def get_files_in_range(self, chat_id: int, first_id: int, last_id: int) -> list[dict]:
+        cursor = self.files.find(
+            {'chat_id': chat_id, 'msg_id': {'$gte': first_id, '$lte': last_id}}
+        ).sort('msg_id', 1)
+        return [doc async for doc in cursor]
+
     # =====================================================
     # AUTO-BATCH SYSTEM
     # =====================================================
 
-    async def add_pending_file(self, file_id: str, filename: str, base_name: str, quality: str, user_id: int, channel_id: int):
-        """Add file to pending batch queue"""
-        import secrets
-        await self.pending_files.insert_one({
-            'file_id': file_id,
-            'filename': filename,
-            'base_name': base_name,
-            'quality': quality,
-            'user_id': user_id,
-            'channel_id': channel_id,
-            'timestamp': datetime.now()
-        })
+    async def add_pending_file(self, file: dict):
+        """Journal a file the auto-batch aggregator is holding; returns the journal _id"""
+        result = await self.pending_files.insert_one(dict(file, timestamp=datetime.now()))
+        return result.inserted_id
 
-    async def get_pending_files(self, time_window_seconds: int = 30):
-        """Get files pending batch grouping within time window"""
-        threshold = datetime.now() - timedelta(seconds=time_window_seconds)
-        cursor = self.pending_files.find({
-            'timestamp': {'$gte': threshold}
-        })
+    async def get_pending_files(self) -> list[dict]:
+        """Every journaled file, oldest first (crash recovery)"""
+        cursor = self.pending_files.find({}).sort('timestamp', 1)
         return [doc async for doc in cursor]
 
+    async def remove_pending_files(self, ids: list):
+        """Drop journal entries once their group has been flushed"""
+        if ids:
+            await self.pending_files.delete_many({'_id': {'$in': list(ids)}})
+
     async def create_batch(self, base_name: str, files: list) -> str:
         """Create a batch group from files"""
         import secrets
@@ -536,61 +920,94 @@ class MongoDB:
             'created': datetime.now()
         })
         
-        # Remove files from pending
-        file_ids = [f['file_id'] for f in files]
-        await self.pending_files.delete_many({'file_id': {'$in': file_ids}})
-        
         return batch_id
 
     async def get_batch(self, batch_id: str):
         """Get batch by ID"""
         return await self.batch_groups.find_one({'batch_id': batch_id})
 
-    async def cleanup_old_pending(self, max_age_seconds: int = 120):
-        """Remove old pending files"""
-        threshold = datetime.now() - timedelta(seconds=max_age_seconds)
-        await self.pending_files.delete_many({
-            'timestamp': {'$lt': threshold}
-        })
-
     # ─────────────────────────────────────────────
     #  ForceSub Join Tracking (join-request channels)
     # ─────────────────────────────────────────────
+    # One document per (channel_id, user_id, kind) in `fsub_members`:
+    #   kind 'join' -> user sent a join request (request=True channels)
+    #   kind 'stat' -> user was verified as a member (stats panel)
+    async def _add_fsub_member(self, channel_id: int, user_id: int, kind: str):
+        try:
+            await self.fsub_members.update_one(
+                {'channel_id': channel_id, 'user_id': user_id, 'kind': kind},
+                {'$setOnInsert': {'created': datetime.now()}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            pass  # Concurrent upsert already inserted it
+
     async def add_channel_user(self, channel_id: int, user_id: int):
         """Record that a user sent a join request to channel_id (used by join_request.py)."""
-        await self.bot_config.update_one(
-            {'_id': f'fsub_join_{channel_id}'},
-            {'$addToSet': {'users': user_id}},
-            upsert=True
-        )
+        await self._add_fsub_member(channel_id, user_id, 'join')
 
     async def is_user_in_channel(self, channel_id: int, user_id: int) -> bool:
         """Check if a user previously sent a join request to channel_id (request=True channels)."""
-        doc = await self.bot_config.find_one({'_id': f'fsub_join_{channel_id}'})
-        if doc and 'users' in doc:
-            return user_id in doc['users']
-        return False
+        doc = await self.fsub_members.find_one(
+            {'channel_id': channel_id, 'user_id': user_id, 'kind': 'join'},
+            {'_id': 1}
+        )
+        return doc is not None
 
     # ─────────────────────────────────────────────
     #  ForceSub Join Count Stats (all channels)
     # ─────────────────────────────────────────────
     async def record_stat_user(self, channel_id: int, user_id: int):
         """Record a verified join for stats purposes. Separate from join-request tracking."""
-        await self.bot_config.update_one(
-            {'_id': f'fsub_stat_{channel_id}'},
-            {'$addToSet': {'users': user_id}},
-            upsert=True
-        )
+        await self._add_fsub_member(channel_id, user_id, 'stat')
 
     async def get_channel_join_count(self, channel_id: int) -> int:
         """Return how many unique users were verified as joined via this bot (for stats panel)."""
         # Count from both stat records (direct joins) and join-request records
-        count = 0
-        for key in [f'fsub_stat_{channel_id}', f'fsub_join_{channel_id}']:
-            doc = await self.bot_config.find_one({'_id': key})
-            if doc and 'users' in doc:
-                count += len(doc['users'])
-        return count
+        return await self.fsub_members.count_documents({'channel_id': channel_id})
+
+    async def migrate_fsub_members(self, chunk_size: int = 1000) -> int:
+        """
+        One-shot move of the old bot_config `fsub_join_{id}` / `fsub_stat_{id}` user arrays
+        into `fsub_members`. Old documents are deleted once copied. Returns rows migrated.
+        """
+        migrated = 0
+        cursor = self.bot_config.find({'_id': {'$regex': '^fsub_(join|stat)_'}})
+        async for doc in cursor:
+            _, kind, channel_id = doc['_id'].split('_', 2)
+            users = doc.get('users', [])
+            now = datetime.now()
+            for i in range(0, len(users), chunk_size):
+                rows = [
+                    {'channel_id': int(channel_id), 'user_id': uid, 'kind': kind, 'created': now}
+                    for uid in users[i:i + chunk_size]
+                ]
+                try:
+                    result = await self.fsub_members.insert_many(rows, ordered=False)
+                    migrated += len(result.inserted_ids)
+                except BulkWriteError as e:
+                    # Rows already migrated by an interrupted earlier run
+                    migrated += e.details.get('nInserted', 0)
+            await self.bot_config.delete_one({'_id': doc['_id']})
+        return migrated
+
+    async def migrate_broadcast_jobs(self, bot_name: str, chunk_size: int = 1000) -> int:
+        """
+        One-shot move of old per-message `broadcast_jobs` TTL entries into `delete_jobs`.
+        Returns jobs migrated.
+        """
+        migrated = 0
+        while True:
+            docs = await self.broadcast_jobs.find().limit(chunk_size).to_list(length=chunk_size)
+            if not docs:
+                return migrated
+            await self.add_delete_jobs([
+                {'bot': bot_name, 'chat_id': doc['chat_id'], 'message_ids': [doc['message_id']],
+                 'due_ts': doc.get('delete_ts', 0)}
+                for doc in docs
+            ])
+            await self.broadcast_jobs.delete_many({'_id': {'$in': [doc['_id'] for doc in docs]}})
+            migrated += len(docs)
 
 
     # ─────────────────────────────────────────────
@@ -615,6 +1032,21 @@ class MongoDB:
             return None
         return {entry['id']: entry['info'] for entry in doc['channels']}
 
+    async def load_fsub_links(self) -> dict:
+        """Cached fsub chat titles and invite links: {channel_id: {'name', 'link', 'req'}}."""
+        doc = await self.bot_config.find_one({'_id': 'fsub_links'})
+        if not doc:
+            return {}
+        return {entry['id']: entry for entry in doc.get('links', [])}
+
+    async def save_fsub_links(self, links: dict):
+        """Persist resolved fsub titles/links so restarts skip get_chat and create_chat_invite_link."""
+        await self.bot_config.update_one(
+            {'_id': 'fsub_links'},
+            {'$set': {'links': [dict(info, id=cid) for cid, info in links.items()]}},
+            upsert=True
+        )
+
     # ─────────────────────────────────────────────
     #  Admin Persistence
     # ─────────────────────────────────────────────
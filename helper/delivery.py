@@ -0,0 +1,301 @@
+import asyncio
+from datetime import datetime
+from pyrogram.errors import FloodWait
+from pyrogram.enums import ParseMode
+from helper.font_converter import to_small_caps as sc
+from helper.helper_func import get_messages
+from helper.quality_detector import extract_quality, get_base_name
+
+# Media that send_cached_media can resend from a file_id alone
+CACHEABLE_MEDIA = {'audio', 'document', 'photo', 'sticker', 'video', 'animation', 'voice', 'video_note'}
+
+
+def file_record(msg, chat_id: int | None = None, msg_id: int | None = None) -> dict:
+    """
+    `files` collection document for a DB-channel post. Pass chat_id / msg_id when
+    `msg` is a copy of the post (e.g. a forward the admin sent to the bot).
+    """
+    media_type = msg.media.value if msg.media else None
+    media = getattr(msg, media_type, None) if media_type else None
+    name = getattr(media, 'file_name', None)
+    return {
+        'chat_id': chat_id or msg.chat.id,
+        'msg_id': msg_id or msg.id,
+        'media_type': media_type,
+        'file_id': getattr(media, 'file_id', None),
+        'file_unique_id': getattr(media, 'file_unique_id', None),
+        'name': name,
+        'size': getattr(media, 'file_size', None),
+        'mime': getattr(media, 'mime_type', None),
+        'quality': extract_quality(name) if name else None,
+        'base_name': get_base_name(name) if name else None,
+        'caption': msg.caption.html if msg.caption else "",
+        'indexed_at': datetime.now()
+    }
+
+
+async def index_post(client, msg, chat_id: int | None = None, msg_id: int | None = None):
+    """Record a DB-channel post in the `files` collection. Never raises."""
+    try:
+        record = file_record(msg, chat_id, msg_id)
+        await client.mongodb.upsert_files([record])
+        client.message_cache.pop((record['chat_id'], record['msg_id']))
+    except Exception as e:
+        client.LOGGER(__name__, client.name).warning(f"Failed to index post {msg_id or msg.id}: {e}")
+
+
+async def unindex_posts(client, chat_id: int, msg_ids: list[int]):
+    """Drop deleted DB-channel posts from the `files` collection and the message cache. Never raises."""
+    for msg_id in msg_ids:
+        client.message_cache.pop((chat_id, msg_id))
+    try:
+        await client.mongodb.remove_files(chat_id, msg_ids)
+    except Exception as e:
+        client.LOGGER(__name__, client.name).warning(f"Failed to unindex posts {msg_ids}: {e}")
+
+
+class FileDescriptor:
+    """Everything needed to resend a DB-channel message, without the full Message object."""
+
+    __slots__ = (
+        'chat_id', 'msg_id', 'file_id', 'file_unique_id', 'file_name', 'caption_html', 'media_type'
+    )
+
+    def __init__(self, record: dict):
+        self.chat_id = record['chat_id']
+        self.msg_id = record['msg_id']
+        self.file_id = record.get('file_id')
+        self.file_unique_id = record.get('file_unique_id')
+        self.file_name = record.get('name')
+        self.caption_html = record.get('caption') or ""
+        self.media_type = record.get('media_type')
+
+    @property
+    def is_document(self) -> bool:
+        return self.media_type == 'document'
+
+
+async def get_file_descriptors(client, message_ids: list, chat_id=None) -> list:
+    """
+    Descriptors for `message_ids` in the DB channel, in the same order.
+    Looked up in `client.message_cache`, then the `files` collection; only ids
+    in neither are fetched from Telegram (and indexed for next time).
+    Deleted / empty messages are skipped.
+    """
+    chat_id = int(chat_id) if chat_id else int(client.db)
+    cache = client.message_cache
+    found = {}
+    missing = []
+    for msg_id in message_ids:
+        descriptor = cache.get((chat_id, msg_id))
+        if descriptor is None:
+            missing.append(msg_id)
+        else:
+            found[msg_id] = descriptor
+
+    records = []
+    if missing:
+        try:
+            records = list((await client.mongodb.get_files(chat_id, missing)).values())
+        except Exception as e:
+            client.LOGGER(__name__, client.name).warning(f"File index lookup failed: {e}")
+        indexed = {record['msg_id'] for record in records}
+        missing = [msg_id for msg_id in missing if msg_id not in indexed]
+    if missing:
+        fetched = [
+            file_record(msg) for msg in await get_messages(client, missing, chat_id)
+            if msg and not msg.empty
+        ]
+        try:
+            await client.mongodb.upsert_files(fetched)
+        except Exception as e:
+            client.LOGGER(__name__, client.name).warning(f"File index update failed: {e}")
+        records.extend(fetched)
+
+    for record in records:
+        descriptor = FileDescriptor(record)
+        cache.set((chat_id, record['msg_id']), descriptor)
+        found[record['msg_id']] = descriptor
+    return [found[msg_id] for msg_id in message_ids if msg_id in found]
+
+
+def build_caption(client, file: FileDescriptor) -> str:
+    """Caption for a delivered file: the CAPTION template if set, else the original caption."""
+    return (
+        client.messages.get('CAPTION', '').format(
+            previouscaption=f"<blockquote>{file.caption_html}</blockquote>" if file.caption_html else f"<blockquote>{file.file_name}</blockquote>"
+        )
+        if client.messages.get('CAPTION', '') and file.is_document
+        else file.caption_html
+    )
+
+
+def match_forwarded(chunk: list, forwarded: list) -> dict:
+    """
+    Pair bulk-forwarded copies with the FileDescriptors they came from: {msg_id: copy}.
+    `drop_author` strips the source message id, but copies keep the source order
+    and the media's file_unique_id, so posts that didn't forward are simply skipped.
+    """
+    pairs = {}
+    copies = iter(sorted(forwarded, key=lambda msg: msg.id))
+    copy = next(copies, None)
+    for file in chunk:
+        if copy is not None and _same_post(file, copy):
+            pairs[file.msg_id] = copy
+            copy = next(copies, None)
+    return pairs
+
+
+def _same_post(file: FileDescriptor, msg) -> bool:
+    media_type = msg.media.value if msg.media else None
+    if media_type != file.media_type:
+        return False
+    if file.file_unique_id:
+        return getattr(getattr(msg, media_type, None), 'file_unique_id', None) == file.file_unique_id
+    return True
+
+
+class DeliveryPipeline:
+    """
+    Sends stored files to one user in their original order.
+
+    Files are forwarded with `drop_author` in chunks of up to 100 ids, so a
+    50-episode pack is one RPC instead of 50 and arrives in order. Files whose
+    caption needs rewriting are then edited concurrently (edits never reorder
+    the chat). Single files go straight out with `send_cached_media`.
+    A FloodWait only stalls this user's delivery.
+    """
+
+    CHUNK = 100
+
+    def __init__(self, client, user_id: int, concurrency: int = 5, progress=None):
+        self.client = client
+        self.user_id = user_id
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.progress = progress  # async callable(done, total)
+
+    async def send(self, files: list) -> list:
+        """Deliver FileDescriptors; returns the sent messages in the same order (failed ones skipped)."""
+        sent = []
+        for chunk in self._chunks(files):
+            sent.extend(await self._send_chunk(chunk))
+            await self._report(len(sent), len(files))
+        await asyncio.gather(*(
+            self._fix_caption(file, out) for file, out in sent if out is not None
+        ))
+        return [out for _, out in sent if out is not None]
+
+    async def deliver(self, files: list, reply_to=None) -> list:
+        """`send()` with a live "sending x/y" status message for packs bigger than one chunk."""
+        if reply_to is None or len(files) <= self.CHUNK:
+            return await self.send(files)
+        status = await reply_to.reply(f"{sc('sending files')}.. 0/{len(files)}")
+
+        async def progress(done, total):
+            await status.edit_text(f"{sc('sending files')}.. {done}/{total}")
+
+        self.progress = progress
+        try:
+            return await self.send(files)
+        finally:
+            await status.delete()
+
+    def _chunks(self, files: list):
+        """Consecutive runs from the same source chat, at most CHUNK long."""
+        chunk = []
+        for file in files:
+            if chunk and (len(chunk) >= self.CHUNK or file.chat_id != chunk[0].chat_id):
+                yield chunk
+                chunk = []
+            chunk.append(file)
+        if chunk:
+            yield chunk
+
+    async def _retry(self, method, **kwargs):
+        for _ in range(3):
+            try:
+                return await method(**kwargs)
+            except FloodWait as e:
+                await asyncio.sleep(getattr(e, 'value', 1) or 1)
+        return await method(**kwargs)
+
+    async def _send_chunk(self, chunk: list) -> list:
+        if len(chunk) == 1:
+            return await self._send_each(chunk)  # One RPC either way, and no caption edit
+        try:
+            result = await self._retry(
+                self.client.forward_messages,
+                chat_id=self.user_id,
+                from_chat_id=chunk[0].chat_id,
+                message_ids=[file.msg_id for file in chunk],
+                protect_content=self.client.protect,
+                drop_author=True
+            )
+            if not isinstance(result, list):
+                result = [result]
+        except Exception as e:
+            self.client.LOGGER(__name__, self.client.name).warning(f"Bulk forward failed, sending one by one: {e}")
+            return await self._send_each(chunk)
+        if len(result) == len(chunk):
+            return list(zip(chunk, result))
+        # Some posts didn't forward (deleted / service messages): keep the copies that
+        # did arrive and send only the rest, so nothing is duplicated or left undeletable
+        forwarded = match_forwarded(chunk, result)
+        retried = dict(await self._send_each([file for file in chunk if file.msg_id not in forwarded]))
+        return [(file, forwarded.get(file.msg_id) or retried.get(file)) for file in chunk]
+
+    async def _send_each(self, chunk: list) -> list:
+        pairs = []
+        for file in chunk:
+            try:
+                pairs.append((file, await self._send_one(file)))
+            except Exception:
+                pairs.append((file, None))  # Skip files that can't be sent, as before
+        return pairs
+
+    async def _send_one(self, file: FileDescriptor):
+        caption = build_caption(self.client, file)
+        if file.file_id and file.media_type in CACHEABLE_MEDIA:
+            try:
+                return await self._retry(
+                    self.client.send_cached_media,
+                    chat_id=self.user_id, file_id=file.file_id, caption=caption,
+                    parse_mode=ParseMode.HTML, protect_content=self.client.protect
+                )
+            except FloodWait:
+                raise
+            except Exception as e:
+                # Stale file_id, or one issued to another bot sharing the index: copy the
+                # post instead, and drop the entry so the next lookup re-indexes it
+                self.client.LOGGER(__name__, self.client.name).warning(
+                    f"Cached send failed for {file.chat_id}/{file.msg_id}, copying instead: {e}"
+                )
+                await unindex_posts(self.client, file.chat_id, [file.msg_id])
+        return await self._retry(
+            self.client.copy_message,
+            chat_id=self.user_id, from_chat_id=file.chat_id, message_id=file.msg_id,
+            caption=caption if file.media_type else None, protect_content=self.client.protect
+        )
+
+    async def _fix_caption(self, file: FileDescriptor, out):
+        if not file.media_type:
+            return
+        caption = build_caption(self.client, file)
+        current = out.caption.html if out.caption else ""
+        if caption == current:
+            return
+        async with self.semaphore:
+            try:
+                await self._retry(
+                    self.client.edit_message_caption,
+                    chat_id=self.user_id, message_id=out.id, caption=caption, parse_mode=ParseMode.HTML
+                )
+            except Exception as e:
+                self.client.LOGGER(__name__, self.client.name).warning(f"Caption update failed for {out.id}: {e}")
+
+    async def _report(self, done: int, total: int):
+        if self.progress:
+            try:
+                await self.progress(done, total)
+            except Exception:
+                pass
@@ -1,22 +1,33 @@
-import motor.motor_asyncio
+import asyncio
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
 from typing import Any, Optional
 from datetime import datetime, timedelta
+from helper.connections import get_mongo_client
 import secrets
 import string
 
+# Fields of a credit document the summary views need (never the legacy `transactions` array)
+CREDIT_FIELDS = {
+    "balance": 1, "expiry": 1, "total_earned": 1, "total_spent": 1,
+    "referral_code": 1, "referred_by": 1, "referral_count": 1, "referral_earnings": 1
+}
+
 class EnhancedCreditDB:
     """Enhanced credit database with expiry, referrals, and transactions"""
     _instances = {}
     client: Any
     db: Any
     credit_data: Any
+    ledger: Any
     
     def __new__(cls, uri: str, db_name: str):
         if (uri, db_name) not in cls._instances:
             instance = super().__new__(cls)
-            instance.client = motor.motor_asyncio.AsyncIOMotorClient(uri)
+            instance.client = get_mongo_client(uri)
             instance.db = instance.client[db_name]
-            instance.credit_data = instance.db["enhanced_credits"]
+            instance.credit_data = instance.db["enhanced_credits"]  # One balance document per user
+            instance.ledger = instance.db["credit_ledger"]  # Append-only transaction history
             cls._instances[(uri, db_name)] = instance
         return cls._instances[(uri, db_name)]
     
@@ -26,7 +37,7 @@ class EnhancedCreditDB:
     
     async def get_credits(self, user_id: int) -> dict:
         """Get user credit info including balance, expiry, etc."""
-        data = await self.credit_data.find_one({"_id": user_id})
+        data = await self.credit_data.find_one({"_id": user_id}, CREDIT_FIELDS)
         if not data:
             return {
                 "balance": 0,
@@ -53,39 +64,39 @@ class EnhancedCreditDB:
         if expiry_days and expiry_days > 0:
             expiry = datetime.now() + timedelta(days=expiry_days)
         
-        await self.credit_data.update_one(
-            {"_id": user_id},
-            {
-                "$inc": {"balance": amount, "total_earned": amount},
-                "$set": {"expiry": expiry} if expiry else {},
-                "$push": {
-                    "transactions": {
-                        "type": "earned",
-                        "amount": amount,
-                        "reason": reason,
-                        "timestamp": datetime.now()
-                    }
-                }
-            },
-            upsert=True
+        await asyncio.gather(
+            self.credit_data.update_one(
+                {"_id": user_id},
+                {
+                    "$inc": {"balance": amount, "total_earned": amount},
+                    **({"$set": {"expiry": expiry}, "$unset": {"warned_at": ""}} if expiry else {})
+                },
+                upsert=True
+            ),
+            self.add_transaction(user_id, "earned", amount, reason)
         )
     
-    async def use_credit(self, user_id: int):
-        """Deduct 1 credit from user account"""
-        await self.credit_data.update_one(
-            {"_id": user_id},
+    async def try_spend(self, user_id: int, n: int = 1, reason: str = "file_access") -> Optional[int]:
+        """
+        Atomically deduct `n` credits if the user has at least `n` unexpired ones.
+        Returns the new balance, or None if nothing was spent. Concurrent calls
+        can never take the balance below zero.
+        """
+        now = datetime.now()
+        data = await self.credit_data.find_one_and_update(
             {
-                "$inc": {"balance": -1, "total_spent": 1},
-                "$push": {
-                    "transactions": {
-                        "type": "spent",
-                        "amount": 1,
-                        "reason": "file_access",
-                        "timestamp": datetime.now()
-                    }
-                }
-            }
+                "_id": user_id,
+                "balance": {"$gte": n},
+                "$or": [{"expiry": None}, {"expiry": {"$gt": now}}]
+            },
+            {"$inc": {"balance": -n, "total_spent": n}},
+            projection={"balance": 1},
+            return_document=ReturnDocument.AFTER
         )
+        if not data:
+            return None
+        await self.add_transaction(user_id, "spent", n, reason)
+        return data["balance"]
     
     async def set_credits(self, user_id: int, amount: int, expiry_days: Optional[int] = None):
         """Set exact credit amount"""
@@ -93,40 +104,20 @@ class EnhancedCreditDB:
         if expiry_days and expiry_days > 0:
             expiry = datetime.now() + timedelta(days=expiry_days)
         
-        await self.credit_data.update_one(
-            {"_id": user_id},
-            {
-                "$set": {
-                    "balance": amount,
-                    "expiry": expiry
-                },
-                "$push": {
-                    "transactions": {
-                        "type": "set",
-                        "amount": amount,
-                        "reason": "admin_set",
-                        "timestamp": datetime.now()
-                    }
-                }
-            },
-            upsert=True
+        await asyncio.gather(
+            self.credit_data.update_one(
+                {"_id": user_id},
+                {"$set": {"balance": amount, "expiry": expiry}, "$unset": {"warned_at": ""}},
+                upsert=True
+            ),
+            self.add_transaction(user_id, "set", amount, "admin_set")
         )
     
     async def reset_credits(self, user_id: int):
         """Reset user credits to 0"""
-        await self.credit_data.update_one(
-            {"_id": user_id},
-            {
-                "$set": {"balance": 0},
-                "$push": {
-                    "transactions": {
-                        "type": "reset",
-                        "amount": 0,
-                        "reason": "admin_reset",
-                        "timestamp": datetime.now()
-                    }
-                }
-            }
+        await asyncio.gather(
+            self.credit_data.update_one({"_id": user_id}, {"$set": {"balance": 0}}),
+            self.add_transaction(user_id, "reset", 0, "admin_reset")
         )
     
     # =====================================================
@@ -135,55 +126,102 @@ class EnhancedCreditDB:
     
     async def check_and_remove_expired(self, user_id: int) -> bool:
         """Check if credits expired and remove them. Returns True if expired."""
-        data = await self.credit_data.find_one({"_id": user_id})
+        data = await self.credit_data.find_one({"_id": user_id}, {"balance": 1, "expiry": 1})
         if not data:
             return False
         
         expiry = data.get("expiry")
         if expiry and datetime.now() > expiry:
-            await self.credit_data.update_one(
-                {"_id": user_id},
-                {
-                    "$set": {"balance": 0, "expiry": None},
-                    "$push": {
-                        "transactions": {
-                            "type": "expired",
-                            "amount": data.get("balance", 0),
-                            "reason": "credits_expired",
-                            "timestamp": datetime.now()
-                        }
-                    }
-                }
+            await asyncio.gather(
+                self.credit_data.update_one(
+                    {"_id": user_id}, {"$set": {"balance": 0, "expiry": None}, "$unset": {"warned_at": ""}}
+                ),
+                self.add_transaction(user_id, "expired", data.get("balance", 0), "credits_expired")
             )
             return True
         return False
     
-    async def get_expiring_soon(self, hours: int = 24) -> list:
-        """Get users whose credits expire within X hours"""
-        threshold = datetime.now() + timedelta(hours=hours)
-        cursor = self.credit_data.find({
-            "expiry": {"$lte": threshold, "$gte": datetime.now()},
-            "balance": {"$gt": 0}
-        })
+    async def _keyset_page(self, query: dict, after: Optional[tuple], limit: int) -> list:
+        """One page of `query` in (expiry, _id) order, starting after the `after` key."""
+        if after:
+            query = {**query, "$or": [
+                {"expiry": {"$gt": after[0]}},
+                {"expiry": after[0], "_id": {"$gt": after[1]}}
+            ]}
+        cursor = self.credit_data.find(query, {"balance": 1, "expiry": 1}).sort(
+            [("expiry", 1), ("_id", 1)]
+        ).limit(limit)
         return [doc async for doc in cursor]
-    
-    async def cleanup_all_expired(self) -> int:
-        """Remove all expired credits. Returns count of users affected."""
+
+    async def iter_expiring_soon(self, hours: int = 24, chunk_size: int = 500):
+        """Pages of not-yet-warned users whose credits expire within X hours"""
         now = datetime.now()
-        result = await self.credit_data.update_many(
-            {"expiry": {"$lte": now}, "balance": {"$gt": 0}},
-            {
-                "$set": {"balance": 0, "expiry": None},
-                "$push": {
-                    "transactions": {
-                        "type": "expired",
-                        "reason": "auto_cleanup",
-                        "timestamp": now
-                    }
-                }
-            }
+        query = {
+            "expiry": {"$gt": now, "$lte": now + timedelta(hours=hours)},
+            "balance": {"$gt": 0},
+            "warned_at": None
+        }
+        after = None
+        while True:
+            page = await self._keyset_page(query, after, chunk_size)
+            if not page:
+                return
+            yield page
+            if len(page) < chunk_size:
+                return
+            after = (page[-1]["expiry"], page[-1]["_id"])
+
+    async def mark_warned(self, user_ids: list) -> list:
+        """
+        Claim expiry warnings for `user_ids`. Returns the ids this call claimed;
+        a user is only ever claimed once per expiry date.
+        """
+        if not user_ids:
+            return []
+        now = datetime.now()
+        await self.credit_data.update_many(
+            {"_id": {"$in": user_ids}, "warned_at": None},
+            {"$set": {"warned_at": now}}
+        )
+        cursor = self.credit_data.find({"_id": {"$in": user_ids}, "warned_at": now}, {"_id": 1})
+        return [doc["_id"] async for doc in cursor]
+
+    async def next_expiry(self) -> Optional[datetime]:
+        """Earliest expiry date still pending, or None"""
+        doc = await self.credit_data.find_one(
+            {"expiry": {"$ne": None}}, {"expiry": 1}, sort=[("expiry", 1)]
         )
-        return result.modified_count
+        return doc["expiry"] if doc else None
+
+    async def cleanup_all_expired(self, chunk_size: int = 1000) -> int:
+        """
+        Remove all expired credits in keyset-paginated chunks, one update_many and
+        one ledger insert per chunk. Returns count of users whose credits expired.
+        """
+        now = datetime.now()
+        query = {"expiry": {"$lte": now}}
+        expired = 0
+        after = None
+        while True:
+            page = await self._keyset_page(query, after, chunk_size)
+            if not page:
+                break
+            await self.credit_data.update_many(
+                {"_id": {"$in": [doc["_id"] for doc in page]}, "expiry": {"$lte": now}},
+                {"$set": {"balance": 0, "expiry": None}, "$unset": {"warned_at": ""}}
+            )
+            rows = [
+                {"user_id": doc["_id"], "type": "expired", "amount": doc["balance"],
+                 "reason": "auto_cleanup", "timestamp": now}
+                for doc in page if doc.get("balance", 0) > 0
+            ]
+            if rows:
+                await self.ledger.insert_many(rows)
+            expired += len(rows)
+            if len(page) < chunk_size:
+                break
+            after = (page[-1]["expiry"], page[-1]["_id"])
+        return expired
     
     # =====================================================
     # REFERRAL SYSTEM
@@ -196,7 +234,7 @@ class EnhancedCreditDB:
     
     async def create_referral_code(self, user_id: int) -> str:
         """Create or get referral code for user"""
-        data = await self.credit_data.find_one({"_id": user_id})
+        data = await self.credit_data.find_one({"_id": user_id}, {"referral_code": 1})
         
         if data and data.get("referral_code"):
             return data["referral_code"]
@@ -212,14 +250,14 @@ class EnhancedCreditDB:
     async def apply_referral(self, new_user_id: int, referral_code: str) -> Optional[int]:
         """Apply referral code to new user. Returns referrer ID if successful."""
         # Find referrer by code
-        referrer = await self.credit_data.find_one({"referral_code": referral_code})
+        referrer = await self.credit_data.find_one({"referral_code": referral_code}, {"_id": 1})
         if not referrer:
             return None
         
         referrer_id = referrer["_id"]
         
         # Check if user already has a referrer
-        new_user_data = await self.credit_data.find_one({"_id": new_user_id})
+        new_user_data = await self.credit_data.find_one({"_id": new_user_id}, {"referred_by": 1})
         if new_user_data and new_user_data.get("referred_by"):
             return None  # Already referred
         
@@ -238,71 +276,100 @@ class EnhancedCreditDB:
         if expiry_days and expiry_days > 0:
             expiry = datetime.now() + timedelta(days=expiry_days)
         
-        await self.credit_data.update_one(
-            {"_id": referrer_id},
-            {
-                "$inc": {"balance": reward_amount, "total_earned": reward_amount, "referral_count": 1},
-                "$set": {"expiry": expiry} if expiry else {},
-                "$push": {
-                    "transactions": {
-                        "type": "referral_reward",
-                        "amount": reward_amount,
-                        "reason": f"referred_user_{referred_id}",
-                        "timestamp": datetime.now()
-                    }
+        await asyncio.gather(
+            self.credit_data.update_one(
+                {"_id": referrer_id},
+                {
+                    "$inc": {
+                        "balance": reward_amount, "total_earned": reward_amount,
+                        "referral_count": 1, "referral_earnings": reward_amount
+                    },
+                    **({"$set": {"expiry": expiry}, "$unset": {"warned_at": ""}} if expiry else {})
                 }
-            }
+            ),
+            self.add_transaction(referrer_id, "referral_reward", reward_amount, f"referred_user_{referred_id}")
         )
     
     async def get_referral_stats(self, user_id: int) -> dict:
         """Get referral statistics for user"""
-        data = await self.credit_data.find_one({"_id": user_id})
+        data = await self.credit_data.find_one(
+            {"_id": user_id}, {"referral_code": 1, "referral_count": 1, "referral_earnings": 1}
+        )
         if not data:
             return {"referral_code": None, "referral_count": 0, "referral_earnings": 0}
         
-        # Calculate earnings from referrals
-        transactions = data.get("transactions", [])
-        referral_earnings = sum(
-            t.get("amount", 0) for t in transactions 
-            if t.get("type") == "referral_reward"
-        )
-        
         return {
             "referral_code": data.get("referral_code"),
             "referral_count": data.get("referral_count", 0),
-            "referral_earnings": referral_earnings
+            "referral_earnings": data.get("referral_earnings", 0)
         }
     
     # =====================================================
     # TRANSACTIONS
     # =====================================================
     
-    async def get_transactions(self, user_id: int, limit: int = 10) -> list:
-        """Get user's recent transactions"""
-        data = await self.credit_data.find_one({"_id": user_id})
-        if not data:
-            return []
-        
-        transactions = data.get("transactions", [])
-        # Return last N transactions
-        return transactions[-limit:][::-1]  # Reverse to show newest first
+    async def get_transactions(self, user_id: int, limit: int = 10, before: Optional[datetime] = None) -> list:
+        """
+        Get user's recent transactions, newest first.
+        Pass the last entry's `timestamp` as `before` to fetch the next page.
+        """
+        query = {"user_id": user_id}
+        if before:
+            query["timestamp"] = {"$lt": before}
+        cursor = self.ledger.find(query, {"_id": 0, "user_id": 0}).sort("timestamp", -1).limit(limit)
+        return [doc async for doc in cursor]
     
     async def add_transaction(self, user_id: int, trans_type: str, amount: int, reason: str):
         """Add a transaction record"""
-        await self.credit_data.update_one(
-            {"_id": user_id},
-            {
-                "$push": {
-                    "transactions": {
-                        "type": trans_type,
-                        "amount": amount,
-                        "reason": reason,
-                        "timestamp": datetime.now()
+        await self.ledger.insert_one({
+            "user_id": user_id,
+            "type": trans_type,
+            "amount": amount,
+            "reason": reason,
+            "timestamp": datetime.now()
+        })
+    
+    async def migrate_transactions(self, chunk_size: int = 1000) -> int:
+        """
+        One-shot move of the old per-user `transactions` arrays into `credit_ledger`,
+        also filling in `referral_earnings`. Safe to re-run after an interruption:
+        migrated entries get deterministic _ids. Returns entries migrated.
+        """
+        migrated = 0
+        cursor = self.credit_data.find({"transactions": {"$exists": True}}, {"transactions": 1})
+        async for doc in cursor:
+            transactions = doc.get("transactions") or []
+            for i in range(0, len(transactions), chunk_size):
+                rows = [
+                    {
+                        "_id": f"{doc['_id']}:{n}",
+                        "user_id": doc["_id"],
+                        "type": t.get("type"),
+                        "amount": t.get("amount", 0),
+                        "reason": t.get("reason", ""),
+                        "timestamp": t.get("timestamp")
                     }
+                    for n, t in enumerate(transactions[i:i + chunk_size], start=i)
+                ]
+                try:
+                    result = await self.ledger.insert_many(rows, ordered=False)
+                    migrated += len(result.inserted_ids)
+                except BulkWriteError as e:
+                    # Entries already migrated by an interrupted earlier run
+                    migrated += e.details.get("nInserted", 0)
+            # Handlers are live while this runs, so reward_referral may already have
+            # created referral_earnings: add the history rather than overwrite it.
+            # Matching on `transactions` makes the $inc apply at most once.
+            await self.credit_data.update_one(
+                {"_id": doc["_id"], "transactions": {"$exists": True}},
+                {
+                    "$unset": {"transactions": ""},
+                    "$inc": {"referral_earnings": sum(
+                        t.get("amount", 0) for t in transactions if t.get("type") == "referral_reward"
+                    )}
                 }
-            },
-            upsert=True
-        )
+            )
+        return migrated
     
     # =====================================================
     # ADMIN FUNCTIONS
@@ -310,7 +377,7 @@ class EnhancedCreditDB:
     
     async def get_all_users_with_credits(self) -> list:
         """Get all users who have credits"""
-        cursor = self.credit_data.find({"balance": {"$gt": 0}})
+        cursor = self.credit_data.find({"balance": {"$gt": 0}}, {"balance": 1, "expiry": 1})
         return [doc async for doc in cursor]
     
     async def get_credit_statistics(self) -> dict:
@@ -8,39 +8,37 @@ from pyrogram.enums import ChatMemberStatus
 from pyrogram.errors import UserNotParticipant, Forbidden, PeerIdInvalid, ChatAdminRequired, FloodWait
 from datetime import datetime, timedelta
 from pyrogram import errors
-from config import URL_SHORTENERS
+from helper.shortener import shortener_pool
 
-async def shorten_url(long_url: str) -> str:
+
+def create_http_session() -> aiohttp.ClientSession:
+    """
+    Long-lived session for outgoing HTTP calls (URL shorteners).
+    Keeps connections alive and caches DNS so each call skips the TCP/TLS handshake.
     """
-    Shorten URL using configured URL shortener services
+    connector = aiohttp.TCPConnector(
+        limit=100,
+        limit_per_host=20,
+        ttl_dns_cache=300,
+        keepalive_timeout=60
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=10))
+
+
+async def shorten_url(client, long_url: str) -> str:
+    """
+    Shorten URL using the healthiest configured shortener (see helper/shortener.py)
     Returns shortened URL or original URL if shortening fails
     """
-    for provider_key, provider_config in URL_SHORTENERS.items():
-        if not provider_config.get('active', False):
-            continue
-            
-        try:
-            api_url = provider_config['api_url']
-            api_token = provider_config.get('api_token', '')
-            format_param = provider_config.get('format', 'text')
-            
-            params = {
-                'api': api_token,
-                'url': long_url,
-                'format': format_param
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(api_url, params=params, timeout=10) as response:
-                    if response.status == 200:
-                        short_url = await response.text()
-                        short_url = short_url.strip()
-                        if short_url and short_url.startswith('http'):
-                            return short_url
-        except Exception as e:
-            print(f"Error with {provider_key}: {e}")
-            continue
-    
+    session = getattr(client, 'http_session', None)
+    if session is None or session.closed:
+        client.LOGGER(__name__, client.name).warning("HTTP session not started, skipping URL shortener")
+        return long_url
+
+    short_url = await shortener_pool.shorten(client, session, long_url)
+    if short_url:
+        return short_url
+
     # If all providers fail, return original URL
     return long_url
 
@@ -82,7 +80,7 @@ async def get_messages(client, message_ids, chat_id=None):
                 message_ids=temb_ids
             )
         except FloodWait as e:
-            await asyncio.sleep(e.x)
+            await asyncio.sleep(e.value)
             msgs = await client.get_messages(
                 chat_id=chat_id if chat_id else int(client.db),
                 message_ids=temb_ids
@@ -165,42 +163,54 @@ async def is_bot_admin(client, channel_id):
     except Exception as e:
         return False, f"Unexpected error: {str(e)}"
 
-async def check_subscription(client, user_id):
-    """Check if a user is subscribed to all required channels/groups."""
-    from pyrogram.errors import ChatAdminRequired
-    statuses = {}
-
-    for channel_id, (channel_name, channel_link, request, timer) in client.fsub_dict.items():
-        if request:
-            send_req = await client.mongodb.is_user_in_channel(channel_id, user_id)
-            if send_req:
-                statuses[channel_id] = ChatMemberStatus.MEMBER
-                continue
-        try:
+JOINED_STATUSES = {ChatMemberStatus.MEMBER, ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.OWNER, ChatMemberStatus.RESTRICTED}
+
+async def _check_channel(client, channel_id, channel_name, request, user_id):
+    """Membership status of user_id in one force-sub channel (cached when joined)."""
+    cache_key = (channel_id, user_id)
+    cached = client.member_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    if request:
+        send_req = await client.mongodb.is_user_in_channel(channel_id, user_id)
+        if send_req:
+            client.member_cache.set(cache_key, ChatMemberStatus.MEMBER)
+            return ChatMemberStatus.MEMBER
+    try:
+        async with client.fsub_semaphore:
             user = await client.get_chat_member(channel_id, user_id)
-            # LEFT / BANNED count as not joined. RESTRICTED is a member in groups.
-            if user.status in (ChatMemberStatus.LEFT, ChatMemberStatus.BANNED):
-                statuses[channel_id] = ChatMemberStatus.BANNED
-            else:
-                statuses[channel_id] = user.status
-        except UserNotParticipant:
-            statuses[channel_id] = ChatMemberStatus.BANNED
-        except ChatAdminRequired:
-            # Bot is not admin in the group — can't check membership
-            # Treat as unknown-but-blocking so user must verify manually
-            client.LOGGER(__name__, client.name).warning(
-                f"Bot needs admin rights to check membership in {channel_name}. "
-                f"Please make bot admin in the group."
-            )
-            statuses[channel_id] = ChatMemberStatus.BANNED
-        except Forbidden:
-            client.LOGGER(__name__, client.name).warning(f"Bot lacks permission for {channel_name}.")
-            statuses[channel_id] = ChatMemberStatus.BANNED
-        except Exception as e:
-            client.LOGGER(__name__, client.name).warning(f"Error checking {channel_name}: {e}")
-            statuses[channel_id] = ChatMemberStatus.BANNED
+        # LEFT / BANNED count as not joined. RESTRICTED is a member in groups.
+        if user.status in (ChatMemberStatus.LEFT, ChatMemberStatus.BANNED):
+            return ChatMemberStatus.BANNED
+        if user.status in JOINED_STATUSES:
+            client.member_cache.set(cache_key, user.status)
+        return user.status
+    except UserNotParticipant:
+        return ChatMemberStatus.BANNED
+    except ChatAdminRequired:
+        # Bot is not admin in the group — can't check membership
+        # Treat as unknown-but-blocking so user must verify manually
+        client.LOGGER(__name__, client.name).warning(
+            f"Bot needs admin rights to check membership in {channel_name}. "
+            f"Please make bot admin in the group."
+        )
+        return ChatMemberStatus.BANNED
+    except Forbidden:
+        client.LOGGER(__name__, client.name).warning(f"Bot lacks permission for {channel_name}.")
+        return ChatMemberStatus.BANNED
+    except Exception as e:
+        client.LOGGER(__name__, client.name).warning(f"Error checking {channel_name}: {e}")
+        return ChatMemberStatus.BANNED
 
-    return statuses
+async def check_subscription(client, user_id):
+    """Check if a user is subscribed to all required channels/groups (all channels concurrently)."""
+    channels = list(client.fsub_dict.items())
+    results = await asyncio.gather(*(
+        _check_channel(client, channel_id, channel_name, request, user_id)
+        for channel_id, (channel_name, channel_link, request, timer) in channels
+    ))
+    return {channel_id: status for (channel_id, _), status in zip(channels, results)}
 
 
 def is_user_subscribed(statuses):
@@ -208,7 +218,7 @@ def is_user_subscribed(statuses):
     if not statuses:
         return False
     return all(
-        status in {ChatMemberStatus.MEMBER, ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.OWNER, ChatMemberStatus.RESTRICTED}
+        status in JOINED_STATUSES
         for status in statuses.values()
     )
 
@@ -304,30 +314,26 @@ def force_sub(func):
     return wrapper
 
 async def delete_files(messages, client, k, enter):
+    """
+    Queue delivered messages for auto-deletion after `client.auto_del` seconds.
+    The job is stored in MongoDB (see helper/scheduler.py), so it survives restarts;
+    `k` is the warning message that gets edited once the files are gone.
+    """
     auto_del = client.auto_del
-    if auto_del > 0:
-        await asyncio.sleep(auto_del)
-
-        for msg in messages:
-            if msg and msg.chat:
-                try:
-                    await client.delete_messages(chat_id=msg.chat.id, message_ids=[msg.id])
-                except Exception as e:
-                    client.LOGGER(__name__, client.name).warning(f"The attempt to delete the media {getattr(msg, 'id', 'Unknown')} was unsuccessful: {e}")
-            else:
-                client.LOGGER(__name__, client.name).warning("Encountered an empty or deleted message.")
-        
-        command = enter.split(" ")
-        command_part = command[1] if len(command) > 1 else None
-        
-        keyboard = None
-        if command_part:
-            url = f"https://t.me/{client.username}?start={command_part}"
-            keyboard = InlineKeyboardMarkup([
-                [InlineKeyboardButton("🔄 Try Again", url=url)]
-            ])
-            
-    await k.edit_text(
-        "<blockquote><b><i>Your Video / File Is Successfully Deleted ✅</i></b></blockquote>",
-        reply_markup=keyboard
+    if auto_del <= 0:
+        return
+    messages = [msg for msg in messages if msg and msg.chat]
+    if not messages:
+        client.LOGGER(__name__, client.name).warning("Encountered an empty or deleted message.")
+        return
+
+    command = enter.split(" ") if enter else []
+    command_part = command[1] if len(command) > 1 else None
+
+    await client.delete_scheduler.schedule(
+        chat_id=messages[0].chat.id,
+        message_ids=[msg.id for msg in messages],
+        delay=auto_del,
+        warning_id=k.id if k else None,
+        start_arg=command_part
     )
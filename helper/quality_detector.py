@@ -1,5 +1,6 @@
 import re
-from typing import Dict, Optional, Tuple
+from functools import lru_cache
+from typing import Dict, Optional
 
 # Quality patterns and their priority (lower = higher priority in display)
 QUALITY_PATTERNS = {
@@ -11,34 +12,12 @@ QUALITY_PATTERNS = {
     '360p': (r'360p', 0),
 }
 
-def extract_quality(filename: str) -> Optional[str]:
-    """Extract quality tag from filename"""
-    filename_upper = filename.upper()
-    
-    for quality, (pattern, _) in QUALITY_PATTERNS.items():
-        if re.search(pattern, filename, re.IGNORECASE):
-            return quality
-    
-    return None
-
-def get_base_name(filename: str) -> str:
-    """
-    Remove quality tags, episode info, and extension to get base name
-    Example: "Movie.Name.S01E01.1080p.mkv" -> "Movie.Name"
-    """
-    # Remove extension
-    name = filename.rsplit('.', 1)[0] if '.' in filename else filename
-    
-    # Replace separators with spaces to match word boundaries
-    # Replace dots, underscores, dashes, slashes, colons, semicolons, commas
-    name = re.sub(r'[.\-_/;:,\\]+', ' ', name)
-    
-    # Remove quality tags
-    for quality, (pattern, _) in QUALITY_PATTERNS.items():
-        name = re.sub(pattern, '', name, flags=re.IGNORECASE)
-    
-    # Remove common patterns
-    patterns_to_remove = [
+# Tags removed from the name to get the base name. Each stage is one compiled
+# pass; a stage runs after the one before it has removed its tags, so tags
+# glued together ("1080pS01", "2020Dual") still come off as they always did.
+_NOISE_STAGES = [
+    [pattern for pattern, _ in QUALITY_PATTERNS.values()],
+    [
         r'S\d+E\d+',  # Season/Episode
         r'\bS\d+\b',  # S01, S02 (Standalone)
         r'Season\s*\d+',
@@ -46,47 +25,102 @@ def get_base_name(filename: str) -> str:
         r'\d{4}',  # Year
         r'BluRay|BRRip|WEBRip|WEB-DL',
         r'x264|x265|HEVC',
-        r'\bDual\b',          # Dual
-        r'\bAudio\b',         # Audio
-        r'\bMulti\b',         # Multi
-        r'\bmkv\b',           # mkv
-        r'\bmp4\b',           # mp4
-        r'\bavi\b',           # avi
+    ],
+    [
+        r'\bDual\b',
+        r'\bAudio\b',
+        r'\bMulti\b',
+        r'\bmkv\b',
+        r'\bmp4\b',
+        r'\bavi\b',
         r'\[.*?\]',  # Brackets
         r'\(.*?\)',  # Parentheses
-    ]
-    
-    for pattern in patterns_to_remove:
-        name = re.sub(pattern, '', name, flags=re.IGNORECASE)
-    
-    # Clean up extra dots, dashes, spaces
-    name = re.sub(r'[.\-_]+', ' ', name)
-    name = re.sub(r'\s+', ' ', name).strip()
-    
-    return name
+    ],
+]
+
+# Episode markers get_series_name strips on top of the base name
+_EPISODE_NOISE = [
+    r'\bE\d+\b',              # E07, E1
+    r'\bEp\d+\b',             # Ep07
+    r'\bEpisode\s*\d+\b',     # Episode 07
+    r'^\d+\s+',               # "07 Ancient Magus" (Start of string)
+    r'\s+\d+$',               # "Ancient Magus 07" (End of string)
+]
+
+_QUALITY_RE = re.compile(
+    '|'.join(f'(?P<q{i}>{pattern})' for i, (pattern, _) in enumerate(QUALITY_PATTERNS.values())),
+    re.IGNORECASE
+)
+_QUALITY_NAMES = list(QUALITY_PATTERNS)
+_SEPARATORS_RE = re.compile(r'[.\-_/;:,\\]+')
+_NOISE_RES = [re.compile('|'.join(stage), re.IGNORECASE) for stage in _NOISE_STAGES]
+_EPISODE_NOISE_RE = re.compile('|'.join(_EPISODE_NOISE), re.IGNORECASE)
+_SPACES_RE = re.compile(r'[\s.\-_]+')
+# Match S01E01, S01-E01, S01_E01 formats
+_EPISODE_RE = re.compile(r'S(\d+)[._-]*E(\d+)', re.IGNORECASE)
+
+
+class ParsedName:
+    """Everything the batch code needs from a release filename, parsed once."""
+
+    __slots__ = ('quality', 'base_name', 'series_name', 'season', 'episode', 'priority')
+
+    def __init__(self, quality, base_name, series_name, season, episode, priority):
+        self.quality = quality
+        self.base_name = base_name
+        self.series_name = series_name
+        self.season = season
+        self.episode = episode
+        self.priority = priority
+
+    def __repr__(self):
+        return (
+            f"ParsedName(quality={self.quality!r}, base_name={self.base_name!r}, "
+            f"season={self.season}, episode={self.episode})"
+        )
+
+
+@lru_cache(maxsize=20_000)
+def parse_filename(filename: str) -> ParsedName:
+    """
+    Parse a filename into a ParsedName. Results are memoized, so callers can
+    ask for the same name repeatedly (grouping, sorting) without re-parsing.
+    """
+    # When several qualities appear, the first one in QUALITY_PATTERNS wins
+    found = [int(match.lastgroup[1:]) for match in _QUALITY_RE.finditer(filename)]
+    quality = _QUALITY_NAMES[min(found)] if found else None
+
+    # Remove extension, turn separators into spaces so word boundaries match, then drop the tags
+    name = filename.rsplit('.', 1)[0] if '.' in filename else filename
+    name = _SEPARATORS_RE.sub(' ', name)
+    for noise in _NOISE_RES:
+        name = noise.sub('', name)
+    base_name = _SPACES_RE.sub(' ', name).strip()
+    series_name = _SPACES_RE.sub(' ', _EPISODE_NOISE_RE.sub('', base_name)).strip()
+
+    match = _EPISODE_RE.search(filename)
+    season, episode = (int(match.group(1)), int(match.group(2))) if match else (None, None)
+
+    return ParsedName(quality, base_name, series_name, season, episode, get_quality_priority(quality))
+
+
+def extract_quality(filename: str) -> Optional[str]:
+    """Extract quality tag from filename"""
+    return parse_filename(filename).quality
+
+def get_base_name(filename: str) -> str:
+    """
+    Remove quality tags, episode info, and extension to get base name
+    Example: "Movie.Name.S01E01.1080p.mkv" -> "Movie Name"
+    """
+    return parse_filename(filename).base_name
 
 def get_series_name(filename: str) -> str:
     """
     Get series name by removing episode info more aggressively
     Example: "E07 Ancient Magus" -> "Ancient Magus"
     """
-    name = get_base_name(filename)
-    
-    # Remove standalone episode numbers/patterns that get_base_name might miss
-    patterns = [
-        r'\bE\d+\b',              # E07, E1
-        r'\bEp\d+\b',             # Ep07
-        r'\bEpisode\s*\d+\b',     # Episode 07
-        r'^\d+\s+',               # "07 Ancient Magus" (Start of string)
-        r'\s+\d+$'                # "Ancient Magus 07" (End of string)
-    ]
-    
-    for pattern in patterns:
-        name = re.sub(pattern, '', name, flags=re.IGNORECASE)
-    
-    # Cleanup
-    name = re.sub(r'\s+', ' ', name).strip()
-    return name
+    return parse_filename(filename).series_name
 
 def get_quality_priority(quality: str) -> int:
     """Get sort priority for quality"""
@@ -94,30 +128,20 @@ def get_quality_priority(quality: str) -> int:
 
 def parse_episode_info(filename: str) -> Dict:
     """Extract season and episode info"""
-    info = {'season': None, 'episode': None}
-    
-    # Match S01E01, S01-E01, S01_E01 formats
-    match = re.search(r'S(\d+)[._-]*E(\d+)', filename, re.IGNORECASE)
-    if match:
-        info['season'] = int(match.group(1))
-        info['episode'] = int(match.group(2))
-    
-    return info
+    parsed = parse_filename(filename)
+    return {'season': parsed.season, 'episode': parsed.episode}
 
 def should_group_files(file1: str, file2: str) -> bool:
     """Check if two files should be grouped together"""
-    base1 = get_base_name(file1)
-    base2 = get_base_name(file2)
-    
+    parsed1 = parse_filename(file1)
+    parsed2 = parse_filename(file2)
+
     # Must have same base name
-    if base1.lower() != base2.lower():
+    if parsed1.base_name.lower() != parsed2.base_name.lower():
         return False
-    
+
     # Must have different qualities
-    quality1 = extract_quality(file1)
-    quality2 = extract_quality(file2)
-    
-    if not quality1 or not quality2:
+    if not parsed1.quality or not parsed2.quality:
         return False
-    
-    return quality1 != quality2
+
+    return parsed1.quality != parsed2.quality
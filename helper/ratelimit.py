@@ -0,0 +1,31 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Async token bucket. `pause()` stalls every caller, e.g. after a FloodWait."""
+
+    def __init__(self, rate: float, capacity: int | None = None):
+        self.rate = rate
+        self.capacity = capacity or 1  # No bursts: Telegram counts messages per rolling second
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
@@ -0,0 +1,156 @@
+import asyncio
+import heapq
+import itertools
+import time
+from pyrogram.errors import FloodWait
+from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from config import DELETE_WORKERS, DELETE_RATE
+from helper.ratelimit import TokenBucket
+
+DELETED_TEXT = "<blockquote><b><i>Your Video / File Is Successfully Deleted ✅</i></b></blockquote>"
+
+
+class DeleteScheduler:
+    """
+    Durable auto-delete queue shared by file deliveries and broadcast TTLs.
+
+    Every job is stored in the `delete_jobs` collection first, so nothing is
+    lost on restart. Jobs due within `horizon` seconds are also kept in an
+    in-memory min-heap; a single worker sleeps until the next one is due,
+    then deletes everything due in one `delete_messages` call per chat, with
+    up to `workers` chats in flight under a shared rate limit.
+    """
+
+    def __init__(self, client, horizon: int = 60, refill_limit: int = 1000,
+                 workers: int = DELETE_WORKERS, rate: float = DELETE_RATE):
+        self.client = client
+        self.semaphore = asyncio.Semaphore(workers)
+        self.bucket = TokenBucket(rate)
+        self.horizon = horizon
+        self.refill_limit = refill_limit
+        self._heap = []  # (due_ts, seq, job)
+        self._queued = set()  # _ids currently in the heap
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._next_refill = 0.0
+        self._task = None
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._worker())
+        return self._task
+
+    async def schedule(self, chat_id: int, message_ids: list, delay: int,
+                       warning_id: int | None = None, start_arg: str | None = None):
+        """Delete `message_ids` in `chat_id` after `delay` seconds, then mark the warning message."""
+        if not message_ids:
+            return
+        await self.schedule_many([{
+            'chat_id': chat_id,
+            'message_ids': list(message_ids),
+            'warning_id': warning_id,
+            'start_arg': start_arg,
+            'due_ts': int(time.time()) + int(delay)
+        }])
+
+    async def schedule_many(self, jobs: list[dict]):
+        """Store many {chat_id, message_ids, due_ts} jobs in one round-trip."""
+        if not jobs:
+            return
+        for job in jobs:
+            job['bot'] = self.client.name
+        ids = await self.client.mongodb.add_delete_jobs(jobs)
+        for job_id, job in zip(ids, jobs):
+            job['_id'] = job_id
+            self._push(job)
+
+    def _push(self, job: dict):
+        if job['_id'] in self._queued or job['due_ts'] > time.time() + self.horizon:
+            return  # Far-future jobs stay in Mongo until a refill picks them up
+        self._queued.add(job['_id'])
+        is_next = not self._heap or job['due_ts'] < self._heap[0][0]
+        heapq.heappush(self._heap, (job['due_ts'], next(self._seq), job))
+        if is_next:
+            self._wakeup.set()
+
+    async def _refill(self):
+        jobs = await self.client.mongodb.get_due_delete_jobs(
+            self.client.name, int(time.time()) + self.horizon, self.refill_limit
+        )
+        queued = len(self._queued)
+        for job in jobs:
+            self._push(job)
+        # A full page of new jobs means a backlog is waiting; keep draining it
+        backlog = len(jobs) >= self.refill_limit and len(self._queued) > queued
+        self._next_refill = time.monotonic() + (0 if backlog else self.horizon / 2)
+
+    def _pop_due(self) -> list[dict]:
+        now = time.time()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, job = heapq.heappop(self._heap)
+            self._queued.discard(job['_id'])
+            due.append(job)
+        return due
+
+    async def _worker(self):
+        while True:
+            try:
+                if time.monotonic() >= self._next_refill:
+                    await self._refill()
+                due = self._pop_due()
+                if due:
+                    await self._run_jobs(due)
+                    continue
+                sleep_for = self._next_refill - time.monotonic()
+                if self._heap:
+                    sleep_for = min(sleep_for, self._heap[0][0] - time.time())
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=max(0.1, sleep_for))
+                except asyncio.TimeoutError:
+                    pass
+            except Exception as e:
+                self.client.LOGGER(__name__, self.client.name).warning(f"Delete scheduler error: {e}")
+                await asyncio.sleep(5)
+
+    async def _run_jobs(self, jobs: list[dict]):
+        by_chat = {}
+        for job in jobs:
+            by_chat.setdefault(job['chat_id'], []).append(job)
+        await asyncio.gather(*(self._delete_chat(chat_id, chat_jobs) for chat_id, chat_jobs in by_chat.items()))
+        await self.client.mongodb.remove_delete_jobs([job['_id'] for job in jobs])
+
+    async def _delete_chat(self, chat_id: int, jobs: list[dict]):
+        message_ids = [mid for job in jobs for mid in job.get('message_ids', [])]
+        async with self.semaphore:
+            # Telegram accepts at most 100 ids per call
+            for i in range(0, len(message_ids), 100):
+                await self._call(self.client.delete_messages, chat_id=chat_id, message_ids=message_ids[i:i + 100])
+            for job in jobs:
+                if job.get('warning_id'):
+                    await self._mark_deleted(chat_id, job)
+
+    async def _call(self, method, **kwargs):
+        for _ in range(3):
+            await self.bucket.acquire()
+            try:
+                return await method(**kwargs)
+            except FloodWait as e:
+                # Every chat backs off together, then this call is retried
+                self.bucket.pause(getattr(e, 'value', 1) or 1)
+            except Exception as e:
+                self.client.LOGGER(__name__, self.client.name).warning(f"Auto-delete failed for {kwargs.get('chat_id')}: {e}")
+                return None
+
+    async def _mark_deleted(self, chat_id: int, job: dict):
+        keyboard = None
+        if job.get('start_arg'):
+            url = f"https://t.me/{self.client.username}?start={job['start_arg']}"
+            keyboard = InlineKeyboardMarkup([
+                [InlineKeyboardButton("🔄 Try Again", url=url)]
+            ])
+        await self._call(
+            self.client.edit_message_text,
+            chat_id=chat_id, message_id=job['warning_id'], text=DELETED_TEXT, reply_markup=keyboard
+        )
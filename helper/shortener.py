@@ -0,0 +1,133 @@
+import asyncio
+import time
+from collections import deque
+import aiohttp
+from config import URL_SHORTENERS, SHORTENER_HEDGE, SHORTENER_HEDGE_DELAY
+
+
+class ProviderHealth:
+    """Rolling latency / error stats for one shortener plus a simple circuit breaker."""
+
+    def __init__(self, window: int = 50, failure_threshold: int = 3, cooldown: float = 60):
+        self.samples = deque(maxlen=window)  # (latency_seconds, ok)
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+
+    def record(self, latency: float, ok: bool):
+        self.samples.append((latency, ok))
+        if ok:
+            self.consecutive_failures = 0
+            self.open_until = 0.0
+        else:
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= self.failure_threshold:
+                self.open_until = time.monotonic() + self.cooldown
+
+    def record_abandoned(self, latency: float, timed_out: bool):
+        # Lost a hedge race. Hanging past the hedge delay counts as a failure, so a
+        # provider that always times out still trips the breaker; otherwise no sample
+        if timed_out:
+            self.record(latency, False)
+
+    @property
+    def is_open(self) -> bool:
+        # Once the cooldown passes the next call is a trial; another failure re-opens it
+        return time.monotonic() < self.open_until
+
+    @property
+    def error_rate(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+    @property
+    def avg_latency(self) -> float:
+        latencies = [lat for lat, ok in self.samples if ok]
+        return sum(latencies) / len(latencies) if latencies else 0.0
+
+    @property
+    def score(self) -> float:
+        """Lower is better. Untried providers score 0 so they get a chance."""
+        if not self.samples:
+            return 0.0
+        return (self.avg_latency or 1.0) * (1 + 4 * self.error_rate)
+
+
+class ShortenerPool:
+    """
+    Picks shorteners by health instead of config order.
+
+    The healthiest provider is called first; with hedging on, the runner-up is
+    started if the first hasn't answered after SHORTENER_HEDGE_DELAY seconds
+    (or fails sooner) and the first valid link wins. Providers with an open
+    circuit are skipped unless nothing else is left.
+    """
+
+    def __init__(self, hedge: bool = SHORTENER_HEDGE, hedge_delay: float = SHORTENER_HEDGE_DELAY):
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self.health = {}
+
+    def get_health(self, provider_key: str) -> ProviderHealth:
+        if provider_key not in self.health:
+            self.health[provider_key] = ProviderHealth()
+        return self.health[provider_key]
+
+    def ranked_providers(self) -> list:
+        active = [key for key, cfg in URL_SHORTENERS.items() if cfg.get('active', False)]
+        closed = [key for key in active if not self.get_health(key).is_open]
+        return sorted(closed or active, key=lambda key: self.get_health(key).score)
+
+    async def _call(self, client, session: aiohttp.ClientSession, provider_key: str, long_url: str):
+        provider_config = URL_SHORTENERS[provider_key]
+        timeout = aiohttp.ClientTimeout(
+            total=provider_config.get('timeout', 10),
+            connect=provider_config.get('connect_timeout', 3)
+        )
+        params = {
+            'api': provider_config.get('api_token', ''),
+            'url': long_url,
+            'format': provider_config.get('format', 'text')
+        }
+        started = time.monotonic()
+        short_url = None
+        try:
+            async with session.get(provider_config['api_url'], params=params, timeout=timeout) as response:
+                if response.status == 200:
+                    short_url = (await response.text()).strip()
+        except asyncio.CancelledError:
+            latency = time.monotonic() - started
+            self.get_health(provider_key).record_abandoned(latency, timed_out=latency >= self.hedge_delay)
+            raise
+        except Exception as e:
+            client.LOGGER(__name__, client.name).warning(f"Shortener {provider_key} failed: {e}")
+        ok = bool(short_url and short_url.startswith('http'))
+        self.get_health(provider_key).record(time.monotonic() - started, ok)
+        return short_url if ok else None
+
+    async def shorten(self, client, session: aiohttp.ClientSession, long_url: str):
+        """Returns a short URL, or None if every provider failed."""
+        providers = self.ranked_providers()
+        pending = set()
+        try:
+            while providers or pending:
+                if providers:
+                    pending.add(asyncio.create_task(self._call(client, session, providers.pop(0), long_url)))
+                # Wait for an answer, or hedge_delay before starting the next provider
+                wait_for = self.hedge_delay if (self.hedge and providers) else None
+                done, pending = await asyncio.wait(pending, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.result():
+                        return task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+        return None
+
+    def stats(self) -> dict:
+        return {key: self.get_health(key) for key in URL_SHORTENERS}
+
+
+shortener_pool = ShortenerPool()
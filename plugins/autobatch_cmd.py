@@ -6,11 +6,18 @@ from pyrogram import Client, filters
 from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
 from helper.font_converter import to_small_caps as sc
 from helper.quality_detector import extract_quality, get_base_name, get_quality_priority
+from helper.delivery import file_record
+from helper.helper_func import get_messages
+import asyncio
 import re
 
 # Store user states
 user_batch_state = {}
 
+# Range scan: ids per get_messages call and pages fetched at once
+SCAN_PAGE_SIZE = 200
+SCAN_CONCURRENCY = 3
+
 @Client.on_message(filters.private & filters.command("autobatch"))
 async def autobatch_command(client: Client, message: Message):
     """Start manual batch creation process"""
@@ -314,13 +321,17 @@ async def handle_batch_mode(client: Client, query):
     await query.message.edit_text(f"🔄 {sc('processing messages')}...")
     
     try:
-        await process_batch_range(client, query.message, state['first_msg_id'], state['last_msg_id'], mode, state['chat_id'])
+        await process_batch_range(client, query.message, state['first_msg_id'], state['last_msg_id'], mode, state['chat_id'], user_id)
     finally:
         if user_id in user_batch_state:
             del user_batch_state[user_id]
 
-async def process_batch_range(client: Client, message: Message, first_id: int, last_id: int, mode: str = "episode", chat_id: int = None):
-    """Process message range and create batch"""
+async def process_batch_range(client: Client, message: Message, first_id: int, last_id: int, mode: str = "episode", chat_id: int = None, user_id: int = None):
+    """
+    Process message range and create batch.
+    Ids missing from the `files` index are fetched in SCAN_PAGE_SIZE pages, SCAN_CONCURRENCY
+    at a time. If `user_id` is given, /cancelbatch stops the scan between pages.
+    """
     
     # Get DB channel ID from state or default config
     db_channel_id = chat_id or client.db_channel_id
@@ -331,56 +342,89 @@ async def process_batch_range(client: Client, message: Message, first_id: int, l
     # Imports inside function to avoid circular imports if any
     from helper.quality_detector import get_series_name
     
+    def add_record(record):
+        nonlocal total_files
+        msg_id = record['msg_id']
+        if record.get('media_type') != 'document':
+            return
+        
+        filename = record.get('name')
+        if not filename:
+            return
+        
+        # Extract quality
+        quality = extract_quality(filename)
+        if not quality:
+            return
+        
+        # Determine Group Key based on Mode
+        if mode == "episode":
+            # Group by Base Name (includes Episode info)
+            # Key: "Show S01 E01"
+            group_key = get_base_name(filename)
+        else:
+            # Group by Series Name + Quality
+            # Key: "Show S01 [720p]"
+            series_name = get_series_name(filename)
+            group_key = f"{series_name} [{quality}]"
+        
+        if not group_key:
+            return
+        
+        # Add to group
+        if group_key not in files_by_group:
+            files_by_group[group_key] = []
+        
+        files_by_group[group_key].append({
+            'file_id': str(msg_id),
+            'filename': filename,
+            'quality': quality,
+            'channel_id': db_channel_id
+        })
+        
+        total_files += 1
+
     try:
-        # Iterate through message range
-        for msg_id in range(first_id, last_id + 1):
-            try:
-                msg = await client.get_messages(db_channel_id, msg_id)
-                
-                if not msg or not msg.document:
-                    continue
-                
-                filename = msg.document.file_name
-                if not filename:
-                    continue
-                
-                # Extract quality
-                quality = extract_quality(filename)
-                if not quality:
-                    continue
-                
-                # Determine Group Key based on Mode
-                if mode == "episode":
-                    # Group by Base Name (includes Episode info)
-                    # Key: "Show S01 E01"
-                    group_key = get_base_name(filename)
-                else:
-                    # Group by Series Name + Quality
-                    # Key: "Show S01 [720p]"
-                    series_name = get_series_name(filename)
-                    group_key = f"{series_name} [{quality}]"
-                
-                if not group_key:
-                    continue
-                
-                # Add to group
-                if group_key not in files_by_group:
-                    files_by_group[group_key] = []
-                
-                # For Season Batching, we want to check if file already exists in group
-                # to avoid duplicates if multiple quality variants exist (though in season batching we group BY quality)
-                
-                files_by_group[group_key].append({
-                    'file_id': str(msg_id),
-                    'filename': filename,
-                    'quality': quality,
-                    'channel_id': db_channel_id
-                })
-                
-                total_files += 1
-                
-            except Exception as e:
-                continue
+        # Indexed posts come from Mongo; only ids the index hasn't seen hit Telegram
+        records = await client.mongodb.get_files_in_range(db_channel_id, first_id, last_id)
+        known = {r['msg_id'] for r in records}
+        for record in records:
+            add_record(record)
+
+        missing = [msg_id for msg_id in range(first_id, last_id + 1) if msg_id not in known]
+        pages = [missing[i:i + SCAN_PAGE_SIZE] for i in range(0, len(missing), SCAN_PAGE_SIZE)]
+        semaphore = asyncio.Semaphore(SCAN_CONCURRENCY)
+
+        async def fetch_page(ids):
+            async with semaphore:
+                msgs = await get_messages(client, ids, db_channel_id)
+            fetched = [file_record(msg) for msg in msgs if msg and not msg.empty]
+            await client.mongodb.upsert_files(fetched)
+            return len(ids), fetched
+
+        tasks = [asyncio.create_task(fetch_page(ids)) for ids in pages]
+        scanned = len(known)
+        total = last_id - first_id + 1
+        try:
+            # Pages are grouped as they arrive; file order is restored when batches are built
+            for next_page in asyncio.as_completed(tasks):
+                if user_id is not None and user_id not in user_batch_state:
+                    await message.reply(f"❌ {sc('batch creation cancelled')}")
+                    return
+                try:
+                    count, fetched = await next_page
+                except Exception:
+                    continue  # Skip a page that failed, like single messages before
+                for record in fetched:
+                    add_record(record)
+                scanned += count
+                try:
+                    await message.edit_text(f"🔄 {sc('processing messages')}... {scanned}/{total}")
+                except Exception:
+                    pass
+        finally:
+            for task in tasks:
+                task.cancel()
         
         # Create batches
         batches_created = 0
@@ -394,6 +438,7 @@ async def process_batch_range(client: Client, message: Message, first_id: int, l
                 # Sort files
                 # Mode 1: Sort by Quality (480p, 720p...)
                 # Mode 2: Sort by Filename (Ep 1, Ep 2...)
+                files.sort(key=lambda f: int(f['file_id']))  # Channel order first
                 if mode == "episode":
                     files.sort(key=lambda f: get_quality_priority(f['quality']))
                 else:
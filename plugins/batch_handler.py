@@ -5,6 +5,7 @@
 from pyrogram import Client, filters
 from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
 from helper.font_converter import to_small_caps as sc
+from helper.delivery import DeliveryPipeline, get_file_descriptors
 from helper.quality_detector import get_quality_priority
 
 # Use group=1 to give this handler lower priority than /start (which is in group=0 by default)
@@ -32,14 +33,10 @@ async def process_batch(client: Client, message: Message, batch_id: str):
     
     user_id = message.from_user.id
     
-    # Check if user is premium
-    is_premium = await client.mongodb.is_premium(user_id)
-    
-    # Get user credits
-    from helper.enhanced_credit_db import EnhancedCreditDB
-    enhanced_db = EnhancedCreditDB(client.db_uri, client.db_name)
-    credit_data = await enhanced_db.get_credits(user_id)
-    user_credits = credit_data.get("balance", 0)
+    # Premium status and credit balance in one snapshot
+    session = await client.mongodb.get_user_session(user_id)
+    is_premium = session.premium
+    user_credits = session.balance
     
     # Check if credit system is enabled
     credit_system_enabled = await client.mongodb.is_credit_system_enabled()
@@ -66,7 +63,7 @@ async def process_batch(client: Client, message: Message, batch_id: str):
     if is_season_batch:
         # Fetch messages
         file_ids = [int(f['file_id']) for f in files]
-        from helper.helper_func import get_messages, delete_files
+        from helper.helper_func import delete_files
         
         msg_to_delete = await message.reply(f"{sc('processing')}.. ⏳")
         
@@ -83,8 +80,7 @@ async def process_batch(client: Client, message: Message, batch_id: str):
             for chat_id, msg_ids in files_by_channel.items():
                 # Add -100 prefix if missing
                 full_chat_id = int(f"-100{chat_id}")
-                msgs = await get_messages(client, msg_ids, full_chat_id)
-                messages.extend(msgs)
+                messages.extend(await get_file_descriptors(client, msg_ids, full_chat_id))
         except Exception as e:
             await msg_to_delete.edit(f"❌ Error fetching messages: {e}")
             return
@@ -95,35 +91,15 @@ async def process_batch(client: Client, message: Message, batch_id: str):
             
         await msg_to_delete.delete()
         
-        sent_msgs = []
-        for msg in messages:
-            # Caption Logic (Mirrors start.py)
-            caption = (
-                client.messages.get('CAPTION', '').format(
-                    previouscaption=f"<blockquote>{msg.caption.html}</blockquote>" if msg.caption else f"<blockquote>{msg.document.file_name}</blockquote>"
-                )
-                if client.messages.get('CAPTION', '') and msg.document
-                else (msg.caption.html if msg.caption else "")
-            )
-            
-            try:
-                copied = await msg.copy(
-                    chat_id=user_id,
-                    caption=caption,
-                    protect_content=client.protect
-                )
-                sent_msgs.append(copied)
-            except Exception as e:
-                pass
+        sent_msgs = await DeliveryPipeline(client, user_id).deliver(messages, reply_to=message)
                 
         # Auto-Delete Logic
         if sent_msgs and client.auto_del > 0:
             warning = await message.reply(
                 f"<b>⚠️ {sc('files will be deleted in')} {humanize.naturaldelta(client.auto_del)}.</b>"
             )
-            # Run delete_files in background
-            import asyncio
-            asyncio.create_task(delete_files(sent_msgs, client, warning, message.text))
+            # Queued in the persistent delete scheduler
+            await delete_files(sent_msgs, client, warning, message.text)
             
         return
 
@@ -212,38 +188,25 @@ async def batch_file_callback(client: Client, query):
     processing = await query.message.reply(f"⏳ {sc('sending your file')}...")
 
     try:
-        msg = await client.get_messages(channel_id, msg_id)
-        if not msg or msg.empty:
+        files = await get_file_descriptors(client, [msg_id], channel_id)
+        if not files:
             await processing.edit(f"❌ {sc('file not found in database')}")
             return
 
-        caption = (
-            client.messages.get('CAPTION', '').format(
-                previouscaption=(
-                    f"<blockquote>{msg.caption.html}</blockquote>" if msg.caption
-                    else f"<blockquote>{msg.document.file_name if msg.document else ''}</blockquote>"
-                )
-            )
-            if client.messages.get('CAPTION', '') and msg.document
-            else (msg.caption.html if msg.caption else "")
-        )
-
-        sent = await msg.copy(
-            chat_id=user_id,
-            caption=caption,
-            protect_content=client.protect
-        )
+        sent = await DeliveryPipeline(client, user_id).send(files)
+        if not sent:
+            await processing.edit(f"❌ {sc('error')}: {sc('could not send this file')}")
+            return
 
         await processing.delete()
 
         if client.auto_del > 0:
             import humanize
             from helper.helper_func import delete_files
-            import asyncio
             warning = await query.message.reply(
                 f"<b>⚠️ {sc('file will be deleted in')} {humanize.naturaldelta(client.auto_del)}.</b>"
             )
-            asyncio.create_task(delete_files([sent], client, warning, ""))
+            await delete_files(sent, client, warning, "")
 
     except Exception as e:
         await processing.edit(f"❌ {sc('error')}: {e}")
@@ -3,10 +3,10 @@
 
 from pyrogram import Client, filters
 from pyrogram.raw.types import MessageActionPinMessage
-from pyrogram.errors import FloodWait, UserIsBlocked, InputUserDeactivated, UserNotParticipant, Forbidden, PeerIdInvalid, ChatAdminRequired
+from pyrogram.errors import UserNotParticipant, Forbidden, PeerIdInvalid, ChatAdminRequired
+from helper.broadcast import BroadcastEngine
 import asyncio
 import re
-import time
 
 
 def _parse_ttl_token(token: str) -> int:
@@ -41,8 +41,8 @@ def _parse_ttl_token(token: str) -> int:
 async def user_count(client, message):
     if not message.from_user.id in client.admins:
         return await client.send_message(message.from_user.id, client.reply_text)
-    total_users = await client.mongodb.full_userbase()
-    await message.reply(f"**{len(total_users)} Users are using this bot currently!**")
+    total_users = await client.mongodb.count_users()
+    await message.reply(f"**{total_users} Users are using this bot currently!**")
 
 @Client.on_message(filters.private & filters.command('broadcast'))
 async def send_text(client, message):
@@ -120,83 +120,20 @@ async def send_text(client, message):
         await asyncio.sleep(8)
         return await msg.delete()
 
-    query = await client.mongodb.full_userbase()
     broadcast_msg = message.reply_to_message
-    total = 0
-    successful = 0
-    blocked = 0
-    deleted = 0
-    unsuccessful = 0
-
     pls_wait = await message.reply("<blockquote><i>Broadcasting Message.. This will Take Some Time</i></blockquote>")
 
-    async def _schedule_delete_after(chat_id: int, msg_id: int, delay: int):
-        try:
-            await asyncio.sleep(delay)
-            await client.delete_messages(chat_id=chat_id, message_ids=msg_id)
-        except Exception as e:
-            print(f"Failed to auto-delete message {msg_id} in {chat_id}: {e}")
-
-    for chat_id in query:
-        try:
-            sent_msg = await broadcast_msg.copy(chat_id)
-            if action == "pin":
-                # Try to pin; both_sides for private chats when possible
-                try:
-                    await client.pin_chat_message(chat_id=chat_id, message_id=sent_msg.id, both_sides=True)
-                except Exception:
-                    # Fallback without both_sides if not supported
-                    await client.pin_chat_message(chat_id=chat_id, message_id=sent_msg.id)
-            # schedule deletion if ttl provided
-            if ttl_seconds and ttl_seconds > 0:
-                delete_ts = int(time.time()) + int(ttl_seconds)
-                asyncio.create_task(_schedule_delete_after(chat_id, sent_msg.id, ttl_seconds))
-                # persist job for reliability across restarts
-                try:
-                    await client.mongodb.add_broadcast_ttl_job(chat_id, sent_msg.id, delete_ts)
-                except Exception as db_e:
-                    print(f"Failed to persist TTL job for {chat_id}/{sent_msg.id}: {db_e}")
-            successful += 1
-        except FloodWait as e:
-            await asyncio.sleep(getattr(e, 'value', 1))
-            try:
-                sent_msg = await broadcast_msg.copy(chat_id)
-                if action == "pin":
-                    try:
-                        await client.pin_chat_message(chat_id=chat_id, message_id=sent_msg.id, both_sides=True)
-                    except Exception:
-                        await client.pin_chat_message(chat_id=chat_id, message_id=sent_msg.id)
-                if ttl_seconds and ttl_seconds > 0:
-                    delete_ts = int(time.time()) + int(ttl_seconds)
-                    asyncio.create_task(_schedule_delete_after(chat_id, sent_msg.id, ttl_seconds))
-                    try:
-                        await client.mongodb.add_broadcast_ttl_job(chat_id, sent_msg.id, delete_ts)
-                    except Exception as db_e:
-                        print(f"Failed to persist TTL job for {chat_id}/{sent_msg.id}: {db_e}")
-                successful += 1
-            except Exception as ex:
-                print(f"Failed to send after floodwait to {chat_id}: {ex}")
-                unsuccessful += 1
-        except UserIsBlocked:
-            await client.mongodb.del_user(chat_id)
-            blocked += 1
-        except InputUserDeactivated:
-            await client.mongodb.del_user(chat_id)
-            deleted += 1
-        except Exception as e:
-            print(f"Failed to send message to {chat_id}: {e}")
-            unsuccessful += 1
-        total += 1
-
-    status = f"""<blockquote><b><u>Broadcast Completed</u></b></blockquote>
-<blockquote expandable><b>Total Users :</b> <code>{total}</code>
-<b>Successful :</b> <code>{successful}</code>
-<b>Blocked Users :</b> <code>{blocked}</code>
-<b>Deleted Accounts :</b> <code>{deleted}</code>
-<b>Unsuccessful :</b> <code>{unsuccessful}</code><blockquote>"""
-
-    return await pls_wait.edit(status)
-
+    # Runs in the background so the handler is freed; progress is edited into pls_wait
+    engine = await BroadcastEngine.create(
+        client,
+        from_chat_id=broadcast_msg.chat.id,
+        message_id=broadcast_msg.id,
+        action=action,
+        ttl_seconds=ttl_seconds,
+        status_chat_id=pls_wait.chat.id,
+        status_message_id=pls_wait.id
+    )
+    engine.start()
 
 
 # Deprecated: old /pbroadcast command removed in favor of unified /broadcast --action pin
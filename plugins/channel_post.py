@@ -6,12 +6,12 @@ from pyrogram import filters, Client
 from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
 from pyrogram.errors import FloodWait
 from helper.helper_func import encode
+from helper.delivery import index_post, unindex_posts
 
 # NOTE: The channel_post handler has been removed as it was blocking all non-command messages
 # including /start with parameters. If you need this functionality, use a specific command instead.
 
-@Client.on_message(filters.channel & filters.incoming)
-async def new_post(client: Client, message: Message):
+async def is_db_channel(client: Client, chat_id: int) -> bool:
     main_channel = getattr(client, 'db_channel_id', client.db)
     
     # Check if multi-DB is enabled
@@ -21,8 +21,34 @@ async def new_post(client: Client, message: Message):
     else:
         all_channels = [main_channel]
     
-    if message.chat.id not in all_channels:
+    return chat_id in all_channels
+
+
+@Client.on_edited_message(filters.channel)
+async def edited_post(client: Client, message: Message):
+    # Re-index so caption / media edits reach the `files` record and the message cache
+    if await is_db_channel(client, message.chat.id):
+        await index_post(client, message)
+
+
+@Client.on_deleted_messages()
+async def deleted_posts(client: Client, messages: list[Message]):
+    # Deleted posts must stop being deliverable from the `files` index
+    deleted = {}
+    for message in messages:
+        if message.chat:
+            deleted.setdefault(message.chat.id, []).append(message.id)
+    for chat_id, msg_ids in deleted.items():
+        if await is_db_channel(client, chat_id):
+            await unindex_posts(client, chat_id, msg_ids)
+
+
+@Client.on_message(filters.channel & filters.incoming)
+async def new_post(client: Client, message: Message):
+    if not await is_db_channel(client, message.chat.id):
         return
+
+    await index_post(client, message)
         
     if client.disable_btn:
         return
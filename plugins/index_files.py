@@ -0,0 +1,61 @@
+# Made by @Awakeners_Bots
+# GitHub: https://github.com/Awakener_Bots
+
+# File Index Backfill - walks DB channel history into the `files` collection
+from pyrogram import Client, filters
+from pyrogram.types import Message
+from helper.font_converter import to_small_caps as sc
+from helper.helper_func import get_messages
+from helper.delivery import file_record
+
+PAGE_SIZE = 200  # Ids per get_messages call
+EMPTY_PAGES_TO_STOP = 3  # Without an end id, stop after this many empty pages in a row
+
+
+@Client.on_message(filters.private & filters.command("indexfiles"))
+async def index_files(client: Client, message: Message):
+    """
+    Usage: /indexfiles [channel_id] [first_id] [last_id]
+    Defaults to the main DB channel from message 1 until the history runs out.
+    """
+    if message.from_user.id not in client.admins:
+        return await message.reply(client.reply_text)
+
+    args = message.command[1:]
+    try:
+        channel_id = int(args[0]) if len(args) > 0 else int(getattr(client, 'db_channel_id', client.db))
+        first_id = int(args[1]) if len(args) > 1 else 1
+        last_id = int(args[2]) if len(args) > 2 else None
+    except ValueError:
+        return await message.reply(f"❌ {sc('usage')}: <code>/indexfiles [channel_id] [first_id] [last_id]</code>")
+
+    status = await message.reply(f"🔄 {sc('indexing files')}...")
+    indexed = files = empty_pages = 0
+    start = first_id
+    try:
+        while last_id is None or start <= last_id:
+            end = start + PAGE_SIZE - 1 if last_id is None else min(start + PAGE_SIZE - 1, last_id)
+            msgs = await get_messages(client, list(range(start, end + 1)), channel_id)
+            records = [file_record(msg) for msg in msgs if msg and not msg.empty]
+            await client.mongodb.upsert_files(records)
+            indexed += len(records)
+            files += sum(1 for r in records if r['file_id'])
+            start = end + 1
+
+            empty_pages = 0 if records else empty_pages + 1
+            if last_id is None and empty_pages >= EMPTY_PAGES_TO_STOP:
+                break
+            try:
+                await status.edit_text(
+                    f"🔄 {sc('indexing files')}... {sc('up to message')} <code>{end}</code>\n"
+                    f"{sc('posts indexed')}: <code>{indexed}</code> | {sc('files')}: <code>{files}</code>"
+                )
+            except Exception:
+                pass  # Progress only; FloodWait on edits shouldn't stop the backfill
+    except Exception as e:
+        return await status.edit_text(f"❌ {sc('indexing stopped at message')} <code>{start}</code>: {e}")
+
+    await status.edit_text(
+        f"✅ {sc('indexing complete')}\n"
+        f"{sc('posts indexed')}: <code>{indexed}</code> | {sc('files')}: <code>{files}</code>"
+    )
@@ -2,7 +2,7 @@
 # GitHub: https://github.com/Awakener_Bots
 
 from pyrogram import Client, filters
-from pyrogram.types import ChatJoinRequest
+from pyrogram.types import ChatJoinRequest, ChatMemberUpdated
 
 @Client.on_chat_join_request()
 async def handle_join_request(client, join_request: ChatJoinRequest):
@@ -17,8 +17,18 @@ async def handle_join_request(client, join_request: ChatJoinRequest):
     if channel:
         # Track this join
         await client.mongodb.add_channel_user(channel_id, user_id)
+        client.member_cache.pop((channel_id, user_id))
         # Approve the join request so user actually joins
         try:
             await client.approve_chat_join_request(channel_id, user_id)
         except Exception:
             pass
+
+@Client.on_chat_member_updated()
+async def handle_member_update(client, update: ChatMemberUpdated):
+    """Drop cached force-sub membership when a user joins, leaves or is banned."""
+    if update.chat.id not in client.fsub_dict:
+        return
+    member = update.new_chat_member or update.old_chat_member
+    if member and member.user:
+        client.member_cache.pop((update.chat.id, member.user.id))
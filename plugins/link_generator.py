@@ -4,6 +4,7 @@
 from pyrogram import Client, filters
 from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
 from helper.helper_func import encode, get_message_id
+from helper.delivery import index_post
 from helper.font_converter import to_small_caps as sc
 
 @Client.on_message(filters.private & filters.command('batch'))
@@ -170,6 +171,9 @@ async def link_generator(client: Client, message: Message):
                 post = await replied.copy(chat_id=main_channel, caption=replied.caption)
                 msg_id = post.id
                 channel_id = main_channel
+                await index_post(client, post)
+            else:
+                await index_post(client, replied, channel_id, msg_id)
 
             # Extract filename for display
             file_name = ""
@@ -242,7 +246,8 @@ async def link_generator(client: Client, message: Message):
     file_name = ""
     try:
         f_msg = await client.get_messages(channel_id, msg_id)
-        if f_msg:
+        if f_msg and not f_msg.empty:
+            await index_post(client, f_msg)
             if f_msg.document:
                 file_name = f_msg.document.file_name
             elif f_msg.caption:
@@ -319,6 +324,9 @@ async def single_file_gen_handler(client: Client, message: Message):
              channel_id = await client.mongodb.get_next_db_channel(main_channel)
              post = await message.copy(chat_id=channel_id, caption=message.caption)
              msg_id = post.id
+             await index_post(client, post)
+        else:
+             await index_post(client, message, channel_id, msg_id)
              
         # Extract filename for display
         file_name = message.document.file_name if message.document else ""
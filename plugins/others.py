@@ -3,7 +3,9 @@
 
 from pyrogram import Client, filters
 from pyrogram.types import CallbackQuery, Message, InlineKeyboardButton, InlineKeyboardMarkup
-from config import MSG_EFFECT
+from config import MSG_EFFECT, MONGO_MIN_POOL_SIZE, MONGO_MAX_POOL_SIZE
+from helper.connections import available_compressors, pool_stats
+import humanize
 
 
 @Client.on_callback_query(filters.regex('^home$'))
@@ -130,3 +132,61 @@ async def unban(client: Client, message: Message):
         return await message.reply(f"__{c} users have been unbanned!__")
     except Exception as e:
         return await message.reply(f"**Error:** `{e}`")
+
+
+@Client.on_message(filters.command('cachestats'))
+async def cache_stats(client: Client, message: Message):
+    if message.from_user.id not in client.admins:
+        return await message.reply(client.reply_text)
+    caches = {
+        'Message cache': client.message_cache,
+        'Force-sub cache': client.member_cache,
+        'Token link cache': client.mongodb.token_cache,
+    }
+    text = "<blockquote><b>In-memory caches</b></blockquote>\n"
+    for name, cache in caches.items():
+        stats = cache.stats()
+        text += (
+            f"\n<b>{name}:</b> <code>{stats['size']}/{cache.maxsize}</code>\n"
+            f"  • Hits: <code>{stats['hits']}</code> | Misses: <code>{stats['misses']}</code> "
+            f"| Ratio: <code>{stats['hit_ratio']:.1%}</code>\n"
+            f"  • Evictions: <code>{stats['evictions']}</code> "
+            f"| Memory: <code>~{humanize.naturalsize(cache.memory_bytes())}</code>\n"
+        )
+    return await message.reply(text)
+
+
+@Client.on_message(filters.command('indexstats'))
+async def index_stats(client: Client, message: Message):
+    if message.from_user.id not in client.admins:
+        return await message.reply(client.reply_text)
+    try:
+        stats = await client.mongodb.get_index_stats()
+    except Exception as e:
+        return await message.reply(f"**Error:** `{e}`")
+    text = "<blockquote><b>MongoDB index usage</b> (ops since last restart of mongod)</blockquote>\n"
+    for collection, indexes in stats.items():
+        text += f"\n<b>{collection}:</b>\n"
+        for index in indexes:
+            unused = " ⚠️" if index['ops'] == 0 and index['name'] != '_id_' else ""
+            text += f"  • <code>{index['name']}</code>: <code>{index['ops']}</code>{unused}\n"
+    return await message.reply(text)
+
+
+@Client.on_message(filters.command('poolstats'))
+async def pool_stats_command(client: Client, message: Message):
+    if message.from_user.id not in client.admins:
+        return await message.reply(client.reply_text)
+    text = (
+        "<blockquote><b>MongoDB connection pools</b> (shared by all bots in this process)</blockquote>\n"
+        f"\nPool size: <code>{MONGO_MIN_POOL_SIZE}-{MONGO_MAX_POOL_SIZE}</code> "
+        f"| Compressors: <code>{', '.join(available_compressors()) or 'none'}</code>\n"
+    )
+    for host, stats in pool_stats().items():
+        text += (
+            f"\n<b>{host}:</b>\n"
+            f"  • Open: <code>{stats['open']}</code> | In use: <code>{stats['checked_out']}</code>\n"
+            f"  • Created: <code>{stats['created']}</code> | Closed: <code>{stats['closed']}</code> "
+            f"| Checkout failures: <code>{stats['checkout_failures']}</code>\n"
+        )
+    return await message.reply(text)
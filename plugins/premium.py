@@ -169,13 +169,12 @@ async def check_premium(client: Client, message: Message):
     else:
         target = message.from_user.id
 
-    is_premium = await client.mongodb.is_premium(target)
-    data = await client.mongodb.user_data.find_one({"_id": target})
+    session = await client.mongodb.get_user_session(target, register=False, with_credits=False)
 
-    if not is_premium:
+    if not session.premium:
         return await message.reply(f"❌ `{target}` is NOT premium")
 
-    expire = data.get("premium_expire")
+    expire = session.premium_expire
 
     await message.reply(
         f"💎 **PREMIUM ACTIVE**\n"
@@ -192,13 +191,12 @@ async def my_premium(client: Client, message: Message):
 
     uid = message.from_user.id
 
-    is_premium = await client.mongodb.is_premium(uid)
-    data = await client.mongodb.user_data.find_one({"_id": uid})
+    session = await client.mongodb.get_user_session(uid, register=False, with_credits=False)
 
-    if not is_premium:
+    if not session.premium:
         return await message.reply("❌ You are NOT premium.")
 
-    expire = data.get("premium_expire")
+    expire = session.premium_expire
 
     await message.reply(
         f"💎 **Your Premium Status**\n"
@@ -7,6 +7,7 @@ from pyrogram.errors.pyromod import ListenerTimeout
 from config import OWNER_ID, URL_SHORTENERS
 import humanize
 from helper.font_converter import to_small_caps as sc
+from helper.shortener import shortener_pool
 
 @Client.on_callback_query(filters.regex("^settings$"))
 async def settings(client, query):
@@ -567,7 +568,14 @@ async def url_shorteners(client, query):
         status = "✅ Active" if provider.get('active', False) else "❌ Inactive"
         msg += f"**{provider['name']}:** {status}\n"
         msg += f"  • API URL: `{provider['api_url']}`\n"
-        msg += f"  • Token: `{provider.get('api_token', 'Not set')[:10]}...`\n\n"
+        msg += f"  • Token: `{provider.get('api_token', 'Not set')[:10]}...`\n"
+        health = shortener_pool.get_health(key)
+        if health.samples:
+            circuit = "🔴 Open" if health.is_open else "🟢 Closed"
+            msg += f"  • Health: `{health.avg_latency * 1000:.0f} ms` avg, `{health.error_rate:.0%}` errors ({len(health.samples)} calls)\n"
+            msg += f"  • Circuit: {circuit}\n\n"
+        else:
+            msg += "  • Health: `No calls yet`\n\n"
 
     toggle_btn_text = "🔴 Disable System" if token_verification_enabled else "🟢 Enable System"
 
@@ -2,9 +2,9 @@
 # GitHub: https://github.com/Awakener_Bots
 
 from helper.helper_func import *
-from helper.credit_db import credit_db
 from helper.enhanced_credit_db import EnhancedCreditDB
 from helper.font_converter import to_small_caps as sc
+from helper.delivery import DeliveryPipeline, get_file_descriptors
 from pyrogram import Client, filters
 from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
 import humanize
@@ -24,27 +24,19 @@ except:
 @force_sub
 async def start_command(client: Client, message: Message):
     user_id = message.from_user.id
-    present = await client.mongodb.present_user(user_id)
-    if not present:
-        try:
-            await client.mongodb.add_user(user_id)
-        except Exception as e:
-            client.LOGGER(__name__, client.name).warning(f"Error adding a user:\n{e}")
+    # Registers the user and loads ban / premium / credit state in one round-trip
+    session = await client.mongodb.get_user_session(user_id)
+    present = not session.is_new
 
-    is_banned = await client.mongodb.is_banned(user_id)
-    if is_banned:
+    if session.banned:
         return await message.reply(f"**{sc('You have been banned from using this bot!')}**")
     
     # Premium check
-    is_premium_user = await client.mongodb.is_premium(user_id)
+    is_premium_user = session.premium
 
-    # Enhanced credit system
+    # Enhanced credit system (expired credits read as 0 and can't be spent)
     enhanced_db = EnhancedCreditDB(client.db_uri, client.db_name)
-    credit_data = await enhanced_db.get_credits(user_id)
-    user_credits = credit_data.get("balance", 0)
-    
-    # Check for expired credits
-    await enhanced_db.check_and_remove_expired(user_id)
+    user_credits = session.balance
 
     text = message.text
     if len(text) > 7:
@@ -110,9 +102,7 @@ async def start_command(client: Client, message: Message):
 
                 # ONLY Verify if enabled
                 if token_verification_enabled:
-                    # Track shortener click
-                    await client.mongodb.increment_token_clicks(user_id, access_token)
-
+                    # Verifies and tracks the shortener click in one write
                     verify_result = await client.mongodb.verify_access_token(
                         user_id, access_token, original_base64
                     )
@@ -178,10 +168,6 @@ async def start_command(client: Client, message: Message):
                         expiry_days = credit_config.get("expiry_days", 30)
                         verification_reward = await client.mongodb.get_bot_config('verification_reward', 3)
                         await enhanced_db.add_credits(user_id, verification_reward, expiry_days, reason="shortener_solved")
-
-                        # Re-fetch credits to ensure accurate count for deduction
-                        credit_data = await enhanced_db.get_credits(user_id)
-                        user_credits = credit_data.get("balance", 0)
     
                         await message.reply(
                             f"<b>🎉 {sc('verification successful!')}</b>\n"
@@ -304,12 +290,16 @@ async def start_command(client: Client, message: Message):
         # ------------------ USER TRYING TO GET FILE ------------------
         
         # Check if this is user's first file access (for referral reward)
-        is_first_file = credit_data.get("total_spent", 0) == 0 and not is_premium_user
+        is_first_file = session.total_spent == 0 and not is_premium_user
 
         # If user has credits → deduct ONE (ONLY IF SYSTEM ENABLED)
+        # try_spend re-checks the balance atomically, so parallel opens can't overspend
+        remaining = None
         if credit_system_enabled and user_credits > 0 and not is_premium_user:
-            await enhanced_db.use_credit(user_id)
-            user_credits -= 1
+            remaining = await enhanced_db.try_spend(user_id, 1)
+
+        if remaining is not None:
+            user_credits = remaining
             is_premium_user = True
 
             await message.reply(
@@ -318,7 +308,7 @@ async def start_command(client: Client, message: Message):
             )
             
             # Reward referrer if this is first file access
-            if is_first_file and credit_data.get("referred_by"):
+            if is_first_file and session.referred_by:
                 # ... (existing code) ...
                 
                 # Notify referrer
@@ -351,14 +341,10 @@ async def start_command(client: Client, message: Message):
                         t_msg_id = ids[0]
                         t_chat_id = custom_chat_id if 'custom_chat_id' in locals() and custom_chat_id else client.db
                         
-                        # Fetch message
-                        f_msg = await client.get_messages(t_chat_id, t_msg_id)
-                        if f_msg:
-                            if f_msg.document:
-                                content_name = f"🎬 <b>{f_msg.document.file_name}</b>\n\n"
-                            elif f_msg.caption:
-                                # Start of caption usually contains filename or title
-                                pass 
+                        # Cached descriptor, shared with the delivery that follows
+                        f_files = await get_file_descriptors(client, [t_msg_id], t_chat_id)
+                        if f_files and f_files[0].is_document:
+                            content_name = f"🎬 <b>{f_files[0].file_name}</b>\n\n"
                     except:
                         pass
             except Exception as e:
@@ -368,7 +354,7 @@ async def start_command(client: Client, message: Message):
             await client.mongodb.create_access_token(user_id, original_base64, access_token)
             
             file_link = f"https://t.me/{client.username}?start={original_base64}_{access_token}"
-            shortened_url = await shorten_url(file_link)
+            shortened_url = await shorten_url(client, file_link)
             
             await temp_msg.delete()
             
@@ -412,10 +398,10 @@ async def start_command(client: Client, message: Message):
         try:
             if 'custom_chat_id' in locals() and custom_chat_id:
                 # Multi-DB Fetch
-                messages = await get_messages(client, ids, custom_chat_id)
+                messages = await get_file_descriptors(client, ids, custom_chat_id)
             else:
                 # Default DB Fetch
-                messages = await get_messages(client, ids)
+                messages = await get_file_descriptors(client, ids)
         except:
             await temp_msg.edit_text(f"{sc('something went wrong')}..!")
             return
@@ -425,33 +411,14 @@ async def start_command(client: Client, message: Message):
             else:
                 await temp_msg.edit(f"{sc('couldnt find the files in database')}.")
 
-        yugen_msgs = []
-
-        for msg in messages:
-            caption = (
-                client.messages.get('CAPTION', '').format(
-                    previouscaption=f"<blockquote>{msg.caption.html}</blockquote>" if msg.caption else f"<blockquote>{msg.document.file_name}</blockquote>"
-                )
-                if client.messages.get('CAPTION', '') and msg.document
-                else (msg.caption.html if msg.caption else "")
-            )
-
-            try:
-                copied_msg = await msg.copy(
-                    chat_id=user_id,
-                    caption=caption,
-                    protect_content=client.protect
-                )
-                yugen_msgs.append(copied_msg)
-            except:
-                pass
+        yugen_msgs = await DeliveryPipeline(client, user_id).deliver(messages, reply_to=message)
 
         if messages and client.auto_del > 0:
             warning = await client.send_message(
                 user_id,
                 f"<b>⚠️ {sc('file will be deleted in')} {humanize.naturaldelta(client.auto_del)}.</b>"
             )
-            asyncio.create_task(delete_files(yugen_msgs, client, warning, text))
+            await delete_files(yugen_msgs, client, warning, text)
         return
 
     # ---------------- NORMAL /start UI ----------------